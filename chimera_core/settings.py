@@ -145,6 +145,40 @@ LOGIN_URL = '/accounts/login/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered CSV previews, keyed by file content hash and evicted least-recently-used
+CSV_PREVIEW_CACHE_DIR = config('CSV_PREVIEW_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'csv_previews'))
+CSV_PREVIEW_CACHE_MAX_MB = config('CSV_PREVIEW_CACHE_MAX_MB', default=256, cast=int)
+
+# How long the task/comment totals shown under paginated lists may lag behind
+LIST_COUNT_CACHE_SECONDS = config('LIST_COUNT_CACHE_SECONDS', default=60, cast=int)
+
+# Files under cache/ by default, shared by every process on the host (gunicorn
+# workers and run_jobs), so the dashboard and list-partial invalidations reach
+# them all. Point these at Redis or Memcached when processes run on several
+# hosts. A per-process backend such as LocMemCache switches those caches off.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'django')),
+    }
+}
+
+# Upper bound on how long a cached dashboard panel is served (see projects.dashboard_cache)
+DASHBOARD_FRAGMENT_SECONDS = config('DASHBOARD_FRAGMENT_SECONDS', default=300, cast=int)
+
+# Upper bound on how long a cached task/comment/file/inbox partial is served (see projects.partial_cache)
+PROJECT_PARTIAL_CACHE_SECONDS = config('PROJECT_PARTIAL_CACHE_SECONDS', default=300, cast=int)
+
+# Background jobs (python manage.py run_jobs)
+# Set JOBS_WORKER when a run_jobs process is running; without one, jobs run inline in the request
+JOBS_WORKER = config('JOBS_WORKER', default=False, cast=bool)
+JOBS_LOCK_TIMEOUT_SECONDS = config('JOBS_LOCK_TIMEOUT_SECONDS', default=600, cast=int)
+JOBS_RETRY_BACKOFF_SECONDS = config('JOBS_RETRY_BACKOFF_SECONDS', default=30, cast=int)
+
+# Friend-of-friend collaborator suggestions (python manage.py rebuild_collaborator_graph)
+COLLABORATOR_GRAPH_PATH = config('COLLABORATOR_GRAPH_PATH', default=str(BASE_DIR / 'cache' / 'collaborator_graph.npz'))
+SUGGESTED_COLLABORATORS = config('SUGGESTED_COLLABORATORS', default=8, cast=int)
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
@@ -169,4 +203,7 @@ MESSAGE_TAGS = {
     messages.ERROR: 'danger',
 }
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Write task-list read receipts after the response has been sent instead of before it
+READ_RECEIPTS_DEFERRED = config('READ_RECEIPTS_DEFERRED', default=False, cast=bool)
\ No newline at end of file
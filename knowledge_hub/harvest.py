@@ -0,0 +1,312 @@
+"""
+Incremental, batched ingestion of arXiv papers.
+
+A source yields PaperRecords for a category, oldest submission first,
+starting at a given date. harvest() streams them, drops ids already in the
+database (preloaded once into a set), writes the rest with bulk_create in
+batches, and advances the category's HarvestCursor in the same transaction
+as each batch, so an interrupted run resumes where the last batch ended.
+
+harvest_concurrently() runs one producer thread per category (up to
+`workers` at a time): each fetches and parses pages and hands them to the
+calling thread through a bounded queue, so fetching overlaps with database
+writes while only a few pages are ever held in memory. All requests to the
+arXiv API go through one shared RateLimiter, whatever the thread.
+"""
+import datetime
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import HarvestCursor, Paper
+
+
+@dataclass
+class PaperRecord:
+    arxiv_id: str
+    title: str
+    authors: str
+    abstract: str
+    published: datetime.datetime
+    categories: tuple = ()
+
+    def to_paper(self):
+        return Paper(
+            arxiv_id=self.arxiv_id,
+            title=self.title[:512],
+            authors=self.authors[:1024],
+            abstract=self.abstract,
+            publication_date=self.published.date(),
+        )
+
+
+@dataclass
+class HarvestStats:
+    seen: int = 0
+    created: int = 0  # rows sent to bulk_create; a concurrent run may have stored a few first
+    skipped: int = 0
+    batches: int = 0
+    error: str = None
+
+
+class RateLimiter:
+    """Spaces out wait() calls, from any thread, at least `interval` seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ArxivSource:
+    """
+    Pages through the arXiv Atom API for a category, oldest submission
+    first. Safe to share between threads; the RateLimiter (arXiv asks for
+    one request every 3 seconds) is applied to every request, retries included.
+    """
+    API_URL = 'https://export.arxiv.org/api/query'
+
+    def __init__(self, page_size=500, max_results=None, api_url=API_URL, rate_limiter=None, retries=3, timeout=60):
+        self.page_size = page_size
+        self.max_results = max_results
+        self.api_url = api_url
+        self.rate_limiter = rate_limiter or RateLimiter(3.0)
+        self.retries = retries
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            import requests
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def fetch_page(self, query, start, page_size):
+        """Returns (records, total_results) for one page of results."""
+        import feedparser
+        import requests
+
+        params = {
+            'search_query': query, 'start': start, 'max_results': page_size,
+            'sortBy': 'submittedDate', 'sortOrder': 'ascending',
+        }
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+            try:
+                response = self._session.get(self.api_url, params=params, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.RequestException:
+                if attempt == self.retries:
+                    raise
+                continue
+            feed = feedparser.parse(response.content)
+            total = int(feed.feed.get('opensearch_totalresults', 0))
+            # arXiv sometimes answers with an empty page mid-way; asking again fixes it.
+            if feed.entries or start >= total or attempt == self.retries:
+                return [self._to_record(entry) for entry in feed.entries], total
+        return [], 0
+
+    @staticmethod
+    def _to_record(entry):
+        return PaperRecord(
+            arxiv_id=entry.id,
+            title=' '.join(entry.title.split()),
+            authors=', '.join(author.name for author in entry.get('authors', [])),
+            abstract=entry.summary.strip(),
+            published=datetime.datetime.fromisoformat(entry.published),
+            categories=tuple(tag.term for tag in entry.get('tags', [])),
+        )
+
+    def records(self, category, since=None):
+        query = f'cat:{category}'
+        if since is not None:
+            query += f' AND submittedDate:[{since:%Y%m%d%H%M} TO 300001010000]'
+        start, limit = 0, self.max_results
+        while limit is None or start < limit:
+            page_size = self.page_size if limit is None else min(self.page_size, limit - start)
+            page, total = self.fetch_page(query, start, page_size)
+            yield from page
+            start += len(page)
+            if not page or start >= total:
+                break
+
+
+class FileSource:
+    """
+    Reads records from a JSON Lines file, one paper per line with the keys
+    arxiv_id, title, authors (a string or a list), abstract, published
+    (ISO 8601) and categories. Used for offline runs and tests.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def records(self, category, since=None):
+        matching = []
+        with open(self.path, encoding='utf-8') as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if category not in data.get('categories', ()):
+                    continue
+                published = datetime.datetime.fromisoformat(data['published'])
+                if timezone.is_naive(published):
+                    published = timezone.make_aware(published, datetime.timezone.utc)
+                if since is not None and published < since:
+                    continue
+                authors = data['authors']
+                matching.append(PaperRecord(
+                    arxiv_id=data['arxiv_id'],
+                    title=data['title'],
+                    authors=authors if isinstance(authors, str) else ', '.join(authors),
+                    abstract=data['abstract'],
+                    published=published,
+                    categories=tuple(data['categories']),
+                ))
+        matching.sort(key=lambda record: record.published)
+        yield from matching
+
+
+def known_arxiv_ids():
+    return set(Paper.objects.order_by().values_list('arxiv_id', flat=True).iterator(chunk_size=10_000))
+
+
+class CategoryWriter:
+    """
+    Collects one category's records into bulk inserts, skipping known ids,
+    and moves the category's cursor forward (never back) with each batch.
+    """
+
+    def __init__(self, category, batch_size, known_ids, full=False):
+        self.category = category
+        self.batch_size = batch_size
+        self.known_ids = known_ids
+        self.stats = HarvestStats()
+        cursor = HarvestCursor.objects.filter(category=category).first()
+        self.stored_position = cursor.last_submitted if cursor else None
+        # Inclusive: several papers can share a timestamp, and the id set
+        # filters out the ones already stored.
+        self.since = None if full else self.stored_position
+        self.batch = []
+        self.newest = None
+
+    def add(self, record):
+        self.stats.seen += 1
+        if self.newest is None or record.published > self.newest:
+            self.newest = record.published
+        if record.arxiv_id in self.known_ids:
+            self.stats.skipped += 1
+            return
+        self.known_ids.add(record.arxiv_id)
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        advance = self.newest is not None and (self.stored_position is None or self.newest > self.stored_position)
+        if not self.batch and not advance:
+            return
+        with transaction.atomic():
+            if self.batch:
+                Paper.objects.bulk_create([record.to_paper() for record in self.batch], ignore_conflicts=True)
+            if advance:
+                HarvestCursor.objects.update_or_create(category=self.category, defaults={'last_submitted': self.newest})
+                self.stored_position = self.newest
+        self.stats.created += len(self.batch)
+        self.stats.batches += 1
+        self.batch = []
+
+
+def harvest(source, category, batch_size=500, known_ids=None, full=False):
+    """Ingests one category from `source` in the calling thread. Returns HarvestStats."""
+    known_ids = known_arxiv_ids() if known_ids is None else known_ids
+    writer = CategoryWriter(category, batch_size, known_ids, full)
+    for record in source.records(category, writer.since):
+        writer.add(record)
+    writer.flush()
+    return writer.stats
+
+
+class _Stopped(Exception):
+    pass
+
+
+def harvest_concurrently(source, categories, batch_size=500, known_ids=None, full=False,
+                         workers=4, queue_size=8, chunk_size=100):
+    """
+    Ingests several categories at once. Producer threads only fetch and
+    parse; every database query runs in the calling thread. A category
+    that fails is reported in its stats' `error` after what it fetched so
+    far has been stored; the other categories carry on.
+    Returns {category: HarvestStats}.
+    """
+    known_ids = known_arxiv_ids() if known_ids is None else known_ids
+    writers = {category: CategoryWriter(category, batch_size, known_ids, full) for category in categories}
+    chunks = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while True:
+            try:
+                chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    raise _Stopped
+
+    def produce(category, since):
+        try:
+            chunk = []
+            for record in source.records(category, since):
+                if stop.is_set():
+                    raise _Stopped
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    put((category, chunk))
+                    chunk = []
+            if chunk:
+                put((category, chunk))
+            put((category, done))
+        except _Stopped:
+            pass
+        except Exception as exc:
+            if not stop.is_set():
+                put((category, exc))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='harvest') as pool:
+        for category, writer in writers.items():
+            pool.submit(produce, category, writer.since)
+        try:
+            remaining = len(writers)
+            while remaining:
+                category, item = chunks.get()
+                writer = writers[category]
+                if isinstance(item, list):
+                    for record in item:
+                        writer.add(record)
+                    continue
+                remaining -= 1
+                writer.flush()
+                if isinstance(item, Exception):
+                    writer.stats.error = f'{type(item).__name__}: {item}'
+        finally:
+            stop.set()  # unblocks producers if we bail out on a database error
+
+    return {category: writer.stats for category, writer in writers.items()}
@@ -0,0 +1,105 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from knowledge_hub.models import Paper
+from knowledge_hub.search import search_papers
+
+BENCH_PREFIX = 'bench-'
+QUERIES = ['quantum', 'neural network', 'protein folding', 'graph', 'zzyzx']
+PAGE_SIZE = 20
+
+
+def synthetic_vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = {''.join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(size)}
+    return sorted(words) + ['quantum', 'neural', 'network', 'protein', 'folding', 'graph']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares paper search latency of the full-text index against the old icontains scan '
+        'on synthetic papers. Run it against a scratch database, e.g. '
+        'DATABASE_URL=sqlite:////tmp/bench.sqlite3 python manage.py migrate && ... bench_paper_search --scratch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--papers', type=int, default=1_000_000)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic papers afterwards.')
+        parser.add_argument('--scratch', action='store_true',
+                            help='Confirm the configured database is a scratch one the benchmark may fill.')
+
+    def generate(self, count):
+        rng = random.Random(42)
+        vocabulary = synthetic_vocabulary(5000, rng)
+        # Zipf-like word frequencies, so common and rare terms both exist.
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        rng.shuffle(weights)
+
+        existing = Paper.objects.filter(arxiv_id__startswith=BENCH_PREFIX).count()
+        date = datetime.date(2024, 1, 1)
+        batch = []
+        for i in range(existing, count):
+            batch.append(Paper(
+                title=' '.join(rng.choices(vocabulary, weights, k=8)).capitalize(),
+                authors='Synthetic Author',
+                abstract=' '.join(rng.choices(vocabulary, weights, k=120)) + '.',
+                arxiv_id=f'{BENCH_PREFIX}{i}',
+                publication_date=date,
+            ))
+            if len(batch) == 10_000:
+                with transaction.atomic():
+                    Paper.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f"  {i + 1} papers", ending='\r')
+        if batch:
+            with transaction.atomic():
+                Paper.objects.bulk_create(batch)
+        self.stdout.write('')
+
+    def time_it(self, fn, runs):
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1000
+
+    def handle(self, *args, **options):
+        database = connection.settings_dict['NAME']
+        if not options['scratch']:
+            raise CommandError(
+                f"This writes {options['papers']} synthetic papers to the configured database ({database}). "
+                'Point DATABASE_URL at a scratch database and pass --scratch to confirm.'
+            )
+
+        self.stdout.write(f"Generating {options['papers']} synthetic papers in {database}...")
+        try:
+            start = time.perf_counter()
+            self.generate(options['papers'])
+            self.stdout.write(f"Generated in {time.perf_counter() - start:.1f}s")
+
+            def old_path(query):
+                papers = Paper.objects.filter(Q(title__icontains=query) | Q(abstract__icontains=query))
+                return papers.count(), list(papers[:PAGE_SIZE])
+
+            def new_path(query):
+                results = search_papers(query)
+                return results.count(), results[0:PAGE_SIZE]
+
+            self.stdout.write(f"{'query':<18}{'hits':>10}{'icontains ms':>15}{'full-text ms':>15}")
+            for query in QUERIES:
+                hits = search_papers(query).count()
+                old_ms = self.time_it(lambda: old_path(query), options['runs'])
+                new_ms = self.time_it(lambda: new_path(query), options['runs'])
+                self.stdout.write(f"{query:<18}{hits:>10}{old_ms:>15.1f}{new_ms:>15.1f}")
+        finally:
+            # Also after a failed or interrupted run, so no synthetic papers are left behind.
+            if not options['keep']:
+                Paper.objects.filter(arxiv_id__startswith=BENCH_PREFIX).delete()
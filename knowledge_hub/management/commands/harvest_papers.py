@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from knowledge_hub.harvest import ArxivSource, FileSource, RateLimiter, harvest_concurrently, known_arxiv_ids
+
+
+class Command(BaseCommand):
+    help = 'Harvests papers from arXiv (or a JSON Lines file) into the database, resuming where the last run stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', action='append', dest='categories',
+                            help='arXiv category to harvest, e.g. cs.AI. Repeatable. Defaults to cs.AI.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Papers written per bulk insert.')
+        parser.add_argument('--page-size', type=int, default=500, help='Results requested per arXiv API page.')
+        parser.add_argument('--max-results', type=int, default=None, help='Stop after this many results per category.')
+        parser.add_argument('--workers', type=int, default=4, help='Categories fetched at the same time.')
+        parser.add_argument('--request-interval', type=float, default=3.0,
+                            help='Minimum seconds between two API requests, across all workers.')
+        parser.add_argument('--api-url', default=ArxivSource.API_URL, help='arXiv API endpoint (or a local mirror).')
+        parser.add_argument('--source-file', help='Read papers from this JSON Lines file instead of the arXiv API.')
+        parser.add_argument('--full', action='store_true', help='Ignore the resume cursors and harvest from the start.')
+
+    def handle(self, *args, **options):
+        if options['source_file']:
+            source = FileSource(options['source_file'])
+        else:
+            source = ArxivSource(
+                page_size=options['page_size'],
+                max_results=options['max_results'],
+                api_url=options['api_url'],
+                rate_limiter=RateLimiter(options['request_interval']),
+            )
+
+        known_ids = known_arxiv_ids()
+        self.stdout.write(f"{len(known_ids)} papers already stored.")
+
+        start = time.perf_counter()
+        results = harvest_concurrently(
+            source, options['categories'] or ['cs.AI'], batch_size=options['batch_size'],
+            known_ids=known_ids, full=options['full'], workers=options['workers'],
+        )
+        for category, stats in results.items():
+            summary = f"{category}: {stats.created} new papers, {stats.skipped} already stored, {stats.batches} batch(es)"
+            if stats.error:
+                self.stderr.write(self.style.ERROR(f"{summary}; stopped early: {stats.error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(summary))
+        self.stdout.write(f"Finished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# SQLite: an external-content FTS5 table kept in sync with knowledge_hub_paper
+# by triggers, so every save, delete, bulk_create or update is indexed.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE knowledge_hub_paper_fts USING fts5(
+        title, authors, abstract,
+        content='knowledge_hub_paper', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER knowledge_hub_paper_fts_ai AFTER INSERT ON knowledge_hub_paper BEGIN
+        INSERT INTO knowledge_hub_paper_fts(rowid, title, authors, abstract)
+        VALUES (new.id, new.title, new.authors, new.abstract);
+    END""",
+    """CREATE TRIGGER knowledge_hub_paper_fts_ad AFTER DELETE ON knowledge_hub_paper BEGIN
+        INSERT INTO knowledge_hub_paper_fts(knowledge_hub_paper_fts, rowid, title, authors, abstract)
+        VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+    END""",
+    """CREATE TRIGGER knowledge_hub_paper_fts_au AFTER UPDATE ON knowledge_hub_paper BEGIN
+        INSERT INTO knowledge_hub_paper_fts(knowledge_hub_paper_fts, rowid, title, authors, abstract)
+        VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+        INSERT INTO knowledge_hub_paper_fts(rowid, title, authors, abstract)
+        VALUES (new.id, new.title, new.authors, new.abstract);
+    END""",
+    "INSERT INTO knowledge_hub_paper_fts(knowledge_hub_paper_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS knowledge_hub_paper_fts_ai",
+    "DROP TRIGGER IF EXISTS knowledge_hub_paper_fts_ad",
+    "DROP TRIGGER IF EXISTS knowledge_hub_paper_fts_au",
+    "DROP TABLE IF EXISTS knowledge_hub_paper_fts",
+]
+
+# Postgres: a GIN expression index; the expression must stay identical to
+# knowledge_hub.search.POSTGRES_DOCUMENT for the planner to use it.
+POSTGRES_FORWARD = [
+    """CREATE INDEX knowledge_hub_paper_search_idx ON knowledge_hub_paper USING GIN ((
+        setweight(to_tsvector('english', title), 'A')
+        || setweight(to_tsvector('english', authors), 'B')
+        || setweight(to_tsvector('english', abstract), 'C')
+    ))""",
+]
+POSTGRES_REVERSE = ["DROP INDEX IF EXISTS knowledge_hub_paper_search_idx"]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_hub', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
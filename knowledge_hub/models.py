@@ -12,4 +12,13 @@ class Paper(models.Model):
         ordering = ['-publication_date']
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class HarvestCursor(models.Model):
+    """How far `harvest_papers` has got in an arXiv category, so reruns only fetch newer papers."""
+    category = models.CharField(max_length=50, unique=True)
+    last_submitted = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.category} up to {self.last_submitted:%Y-%m-%d %H:%M}'
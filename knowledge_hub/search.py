@@ -0,0 +1,143 @@
+"""
+Ranked full-text search over papers.
+
+SQLite uses the knowledge_hub_paper_fts FTS5 table (BM25 ranking, snippet())
+and Postgres a GIN-indexed tsvector expression (ts_rank_cd, ts_headline);
+both are created and kept in sync by migration 0002. Other databases fall
+back to an unranked icontains scan.
+"""
+import re
+from functools import cached_property
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Paper
+
+# Column weights for ranking: a hit in the title counts most.
+SQLITE_BM25_WEIGHTS = (10.0, 3.0, 1.0)  # title, authors, abstract
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', title), 'A') "
+    "|| setweight(to_tsvector('english', authors), 'B') "
+    "|| setweight(to_tsvector('english', abstract), 'C')"
+)
+
+# Snippets are built with these control characters around matches, then
+# HTML-escaped, and only then turned into <mark> tags.
+_HL_START, _HL_END = '\x02', '\x03'
+SNIPPET_WORDS = 32
+
+
+def _fts5_query(query):
+    """Turns free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    if not snippet:
+        return ''
+    return mark_safe(escape(snippet).replace(_HL_START, '<mark>').replace(_HL_END, '</mark>'))
+
+
+class PaperSearchResults:
+    """
+    A lazily evaluated, sliceable result set that Paginator can page through.
+    Each page is one ranked query; the total is one more COUNT query.
+    Papers in a page carry `search_rank` and a pre-escaped, highlighted `snippet`.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.vendor = connection.vendor
+
+    @cached_property
+    def _fts_query(self):
+        return _fts5_query(self.query) if self.vendor == 'sqlite' else self.query
+
+    def count(self):
+        return self._count
+
+    @cached_property
+    def _count(self):
+        if not self._fts_query:
+            return 0
+        if self.vendor == 'sqlite':
+            sql = 'SELECT COUNT(*) FROM knowledge_hub_paper_fts WHERE knowledge_hub_paper_fts MATCH %s'
+        elif self.vendor == 'postgresql':
+            sql = f"SELECT COUNT(*) FROM knowledge_hub_paper WHERE ({POSTGRES_DOCUMENT}) @@ websearch_to_tsquery('english', %s)"
+        else:
+            return self._fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self._fts_query])
+            return cursor.fetchone()[0]
+
+    def _fallback(self):
+        return Paper.objects.filter(Q(title__icontains=self.query) | Q(abstract__icontains=self.query))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        limit = (index.stop if index.stop is not None else self.count()) - offset
+        if limit <= 0 or not self._fts_query:
+            return []
+        if self.vendor not in ('sqlite', 'postgresql'):
+            papers = list(self._fallback()[offset:offset + limit])
+            for paper in papers:
+                paper.search_rank, paper.snippet = None, ''
+            return papers
+        return self._ranked_page(offset, limit)
+
+    def _ranked_page(self, offset, limit):
+        if self.vendor == 'sqlite':
+            weights = ', '.join(str(w) for w in SQLITE_BM25_WEIGHTS)
+            # bm25() is lower-is-better; negate it so search_rank reads like ts_rank.
+            sql = f"""
+                SELECT p.*, -bm25(knowledge_hub_paper_fts, {weights}) AS search_rank,
+                       snippet(knowledge_hub_paper_fts, 2, %s, %s, '…', {SNIPPET_WORDS}) AS snippet
+                FROM knowledge_hub_paper_fts
+                JOIN knowledge_hub_paper p ON p.id = knowledge_hub_paper_fts.rowid
+                WHERE knowledge_hub_paper_fts MATCH %s
+                ORDER BY bm25(knowledge_hub_paper_fts, {weights})
+                LIMIT %s OFFSET %s
+            """
+            params = [_HL_START, _HL_END, self._fts_query, limit, offset]
+        else:
+            # Rank and headline are computed only for the rows of this page.
+            sql = f"""
+                SELECT p.*, hits.rank AS search_rank,
+                       ts_headline('english', p.abstract, hits.q,
+                                   %s) AS snippet
+                FROM (
+                    SELECT id, q, ts_rank_cd({POSTGRES_DOCUMENT}, q) AS rank
+                    FROM knowledge_hub_paper, websearch_to_tsquery('english', %s) q
+                    WHERE ({POSTGRES_DOCUMENT}) @@ q
+                    ORDER BY rank DESC, id
+                    LIMIT %s OFFSET %s
+                ) hits
+                JOIN knowledge_hub_paper p ON p.id = hits.id
+                ORDER BY hits.rank DESC, p.id
+            """
+            options = f'StartSel={_HL_START}, StopSel={_HL_END}, MaxWords={SNIPPET_WORDS}, MinWords=15'
+            params = [options, self._fts_query, limit, offset]
+
+        papers = list(Paper.objects.raw(sql, params))
+        for paper in papers:
+            paper.snippet = _highlight(paper.snippet)
+        return papers
+
+
+def search_papers(query):
+    """Ranked papers matching `query`, best first, ready for a Paginator."""
+    return PaperSearchResults(query)
@@ -1,3 +1,213 @@
+import datetime
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .harvest import ArxivSource, FileSource, RateLimiter, harvest, harvest_concurrently
+from .models import HarvestCursor, Paper
+from .search import search_papers
+
+
+def make_paper(n, title, abstract='', authors='A. Author'):
+    return Paper.objects.create(
+        title=title, authors=authors, abstract=abstract,
+        arxiv_id=f'test-{n}', publication_date=datetime.date(2024, 1, 1),
+    )
+
+
+class PaperSearchTests(TestCase):
+    def test_title_hits_rank_above_abstract_hits(self):
+        in_abstract = make_paper(1, 'Graph methods', 'We apply transformers to graphs.')
+        in_title = make_paper(2, 'Transformers for vision', 'Images as patches.')
+        make_paper(3, 'Unrelated', 'Nothing to see.')
+
+        results = search_papers('transformers')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual([p.id for p in results[0:10]], [in_title.id, in_abstract.id])
+
+    def test_snippet_highlights_matches_and_escapes_html(self):
+        make_paper(1, 'Bounds', 'We prove a <b>tight</b> bound on quantum entanglement.')
+        paper = search_papers('entanglement')[0]
+        self.assertIn('<mark>entanglement</mark>', paper.snippet)
+        self.assertIn('&lt;b&gt;tight&lt;/b&gt;', paper.snippet)
+
+    def test_index_follows_save_and_delete(self):
+        paper = make_paper(1, 'Diffusion models')
+        self.assertEqual(search_papers('diffusion').count(), 1)
+
+        paper.title = 'Score matching'
+        paper.save()
+        self.assertEqual(search_papers('diffusion').count(), 0)
+        self.assertEqual(search_papers('score').count(), 1)
+
+        paper.delete()
+        self.assertEqual(search_papers('score').count(), 0)
+
+    def test_search_view_paginates_in_two_queries(self):
+        for i in range(25):
+            make_paper(i, f'Neural network study {i}')
+        with self.assertNumQueries(2):  # total count + ranked page
+            response = self.client.get(reverse('paper-search'), {'q': 'neural', 'page': 2})
+        self.assertContains(response, '25 paper(s) found.')
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_punctuation_only_query_matches_nothing(self):
+        make_paper(1, 'Anything')
+        self.assertEqual(search_papers('"*()').count(), 0)
+
+
+class HarvestTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'papers.jsonl'
+
+    def write_records(self, records):
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            for arxiv_id, day, categories in records:
+                fh.write(json.dumps({
+                    'arxiv_id': arxiv_id, 'title': f'Paper {arxiv_id}', 'authors': ['Ada', 'Alan'],
+                    'abstract': 'Abstract.', 'published': f'2024-01-{day:02d}T12:00:00+00:00',
+                    'categories': categories,
+                }) + '\n')
+
+    def test_harvest_writes_in_batches_and_dedupes(self):
+        Paper.objects.create(title='Already here', authors='', abstract='', arxiv_id='a1',
+                             publication_date=datetime.date(2024, 1, 1))
+        self.write_records([('a1', 1, ['cs.AI']), ('a2', 2, ['cs.AI']), ('a3', 3, ['cs.AI', 'cs.LG']),
+                            ('a4', 4, ['cs.AI']), ('b1', 5, ['math.CO'])])
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = harvest(FileSource(self.path), 'cs.AI', batch_size=2)
+        paper_inserts = [q for q in ctx.captured_queries if 'INTO "knowledge_hub_paper"' in q['sql']]
+        self.assertEqual(len(paper_inserts), 2)
+        self.assertEqual((stats.seen, stats.created, stats.skipped, stats.batches), (4, 3, 1, 2))
+        self.assertEqual(Paper.objects.get(arxiv_id='a3').authors, 'Ada, Alan')
+        self.assertEqual(HarvestCursor.objects.get(category='cs.AI').last_submitted.day, 4)
+
+    def test_rerun_only_fetches_papers_after_the_cursor(self):
+        self.write_records([('a1', 1, ['cs.AI']), ('a2', 2, ['cs.AI'])])
+        harvest(FileSource(self.path), 'cs.AI')
+        self.write_records([('a3', 3, ['cs.AI'])])
+
+        stats = harvest(FileSource(self.path), 'cs.AI')
+        self.assertEqual((stats.seen, stats.created), (2, 1))  # the boundary paper is re-read, not re-stored
+        self.assertEqual(Paper.objects.count(), 3)
+
+    def test_command_reads_an_offline_file(self):
+        self.write_records([('a1', 1, ['cs.AI']), ('b1', 2, ['math.CO'])])
+        out = StringIO()
+        call_command('harvest_papers', '--source-file', str(self.path), '--category', 'cs.AI',
+                     '--category', 'math.CO', stdout=out)
+        self.assertIn('cs.AI: 1 new papers', out.getvalue())
+        self.assertEqual(set(Paper.objects.values_list('arxiv_id', flat=True)), {'a1', 'b1'})
+
+
+# Shaped like a response of export.arxiv.org/api/query
+ATOM_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <title type="html">ArXiv Query: search_query={query}</title>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{per_page}</opensearch:itemsPerPage>
+  {entries}
+</feed>"""
+
+ATOM_ENTRY = """<entry>
+    <id>http://arxiv.org/abs/{arxiv_id}v1</id>
+    <updated>{published}</updated>
+    <published>{published}</published>
+    <title>A study
+      of {category} #{n}</title>
+    <summary>  Abstract of paper {n}.
+    </summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+    <arxiv:primary_category term="{category}" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="{category}" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>"""
+
+
+class StubArxivHandler(BaseHTTPRequestHandler):
+    papers_per_category = {'cs.AI': 5, 'cs.LG': 3}
+    request_times = []
+
+    def do_GET(self):
+        StubArxivHandler.request_times.append(time.monotonic())
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        category = params['search_query'].split()[0].removeprefix('cat:')
+        if category not in self.papers_per_category:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        total = self.papers_per_category[category]
+        start, per_page = int(params['start']), int(params['max_results'])
+        entries = ''.join(
+            ATOM_ENTRY.format(arxiv_id=f'{category}.{n}', n=n, category=category,
+                              published=f'2024-01-{n + 1:02d}T10:00:00Z')
+            for n in range(start, min(start + per_page, total))
+        )
+        body = ATOM_FEED.format(query=params['search_query'], total=total, start=start,
+                                per_page=per_page, entries=entries).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/atom+xml')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ConcurrentHarvestTests(TestCase):
+    INTERVAL = 0.05
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubArxivHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_url = f'http://127.0.0.1:{cls.server.server_port}/api/query'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubArxivHandler.request_times = []
+        self.source = ArxivSource(page_size=2, api_url=self.api_url, rate_limiter=RateLimiter(self.INTERVAL), retries=1)
+
+    def test_categories_are_paged_concurrently_under_one_rate_limit(self):
+        results = harvest_concurrently(self.source, ['cs.AI', 'cs.LG'], batch_size=2, workers=2, queue_size=1, chunk_size=1)
+
+        self.assertEqual(results['cs.AI'].created, 5)
+        self.assertEqual(results['cs.LG'].created, 3)
+        paper = Paper.objects.get(arxiv_id='http://arxiv.org/abs/cs.AI.4v1')
+        self.assertEqual((paper.title, paper.authors), ('A study of cs.AI #4', 'Ada Lovelace, Alan Turing'))
+        self.assertEqual(HarvestCursor.objects.get(category='cs.LG').last_submitted.day, 3)
+
+        times = StubArxivHandler.request_times
+        self.assertEqual(len(times), 5)  # 3 pages of cs.AI + 2 of cs.LG
+        # Arrival times jitter by a few ms per request, but the limiter's
+        # spacing accumulates: five requests span at least four intervals.
+        self.assertGreaterEqual(times[-1] - times[0], 4 * self.INTERVAL * 0.9)
 
-# Create your tests here.
+    def test_a_failing_category_does_not_stop_the_others(self):
+        results = harvest_concurrently(self.source, ['cs.LG', 'bad.CAT'], workers=2)
+        self.assertEqual(results['cs.LG'].created, 3)
+        self.assertIn('503', results['bad.CAT'].error)
+        self.assertFalse(HarvestCursor.objects.filter(category='bad.CAT').exists())
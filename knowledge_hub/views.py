@@ -1,18 +1,22 @@
+from django.core.paginator import Paginator
 from django.shortcuts import render
-from .models import Paper
-from django.db.models import Q # Import Q objects
+
+from .search import search_papers
+
+PAPERS_PER_PAGE = 20
+
 
 def paper_search(request):
-    query = request.GET.get('q', '')
-    papers = []
+    query = request.GET.get('q', '').strip()
+    page_obj = None
 
     if query:
-        papers = Paper.objects.filter(
-            Q(title__icontains=query) | Q(abstract__icontains=query)
-        )
+        paginator = Paginator(search_papers(query), PAPERS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
 
     context = {
-        'papers': papers,
+        'papers': page_obj,
+        'page_obj': page_obj,
         'query': query,
     }
-    return render(request, 'knowledge_hub/paper_search.html', context)
\ No newline at end of file
+    return render(request, 'knowledge_hub/paper_search.html', context)
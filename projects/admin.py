@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Task, Comment, ProjectMembership, AccessRequest, Ban, Report, ProjectLog
+from .models import Project, Task, Comment, ProjectMembership, AccessRequest, Ban, Report, ProjectLog, Job
 
 class ProjectMembershipInline(admin.TabularInline):
     model = ProjectMembership
@@ -20,4 +20,9 @@ admin.site.register(Comment)
 admin.site.register(AccessRequest)
 admin.site.register(Ban)
 admin.site.register(Report)
-admin.site.register(ProjectLog)
\ No newline at end of file
+admin.site.register(ProjectLog)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('func', 'key', 'status', 'attempts', 'run_after', 'finished_at')
+    list_filter = ('status',)
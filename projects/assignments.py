@@ -0,0 +1,57 @@
+"""
+Bulk task assignment.
+
+Assigning a task to a whole team used to cost a get_or_create (two queries)
+per member. Here the users still missing an assignment are found with one
+query and assigned with one bulk INSERT, whatever the team size.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef, Q
+
+from . import partial_cache
+from .models import ProjectMembership, TaskAssignment
+
+
+def _missing_assignees(task, users):
+    """Ids of `users` (a User queryset) not yet assigned `task`, as one query."""
+    assigned = TaskAssignment.objects.filter(task=task, assignee=OuterRef('pk'))
+    return list(users.filter(~Exists(assigned)).values_list('id', flat=True))
+
+
+def _assign(task, assigner, assignee_ids):
+    TaskAssignment.objects.bulk_create(
+        [TaskAssignment(task=task, assignee_id=assignee_id, assigner=assigner) for assignee_id in assignee_ids],
+        # A concurrent request may have assigned some of them since the lookup.
+        ignore_conflicts=True,
+    )
+    if assignee_ids:
+        # bulk_create sends no post_save, so the task lists are invalidated here.
+        partial_cache.bump(task.project_id)
+    return len(assignee_ids)
+
+
+def assign_task(task, assigner, assignees):
+    """
+    Assigns `task` to each of `assignees` (users or user ids) who does not
+    have it yet. Returns how many assignments were created.
+    """
+    ids = [getattr(assignee, 'pk', assignee) for assignee in assignees]
+    if not ids:
+        return 0
+    return _assign(task, assigner, _missing_assignees(task, User.objects.filter(id__in=ids)))
+
+
+def assign_task_to_members(task, assigner, exclude=()):
+    """
+    Assigns `task` to every member of its project (owner included), except
+    the users in `exclude`, who do not have it yet. Returns how many
+    assignments were created.
+    """
+    members = User.objects.filter(
+        Q(id=task.project.owner_id)
+        | Q(id__in=ProjectMembership.objects.filter(project_id=task.project_id).values('user_id'))
+    )
+    excluded_ids = [getattr(user, 'pk', user) for user in exclude]
+    if excluded_ids:
+        members = members.exclude(id__in=excluded_ids)
+    return _assign(task, assigner, _missing_assignees(task, members))
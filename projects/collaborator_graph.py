@@ -0,0 +1,274 @@
+"""
+Collaborator suggestions from a precomputed graph.
+
+rebuild_collaborator_graph (run it from cron) snapshots every friendship
+and project membership into compressed sparse row (CSR) arrays: for each
+user, the slice friend_indices[friend_indptr[u]:friend_indptr[u + 1]]
+lists their friends, and likewise for users -> projects and projects ->
+members (owners count as members). The arrays are saved to
+COLLABORATOR_GRAPH_PATH and loaded once per process, reloading when the
+file changes.
+
+A user's candidates are their friends' friends and the other members of
+their projects, scored by mutual friends plus shared projects. A
+suggestion gathers the user's two-hop neighbourhood with numpy slices and
+counts it with bincount, without touching the database. Until a graph has
+been built, suggest_collaborators() logs a warning and counts the same
+neighbourhood with aggregate queries instead.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+GRAPH_VERSION = 1
+
+_lock = threading.Lock()
+_loaded = {}  # path -> (mtime, CollaboratorGraph)
+
+
+@dataclass
+class Suggestion:
+    user_id: int
+    mutual_friends: int
+    shared_projects: int
+
+    @property
+    def score(self):
+        return self.mutual_friends + self.shared_projects
+
+
+def _csr(rows, cols, n_rows):
+    """(indptr, indices) for the (row, col) pairs, with each row's columns sorted."""
+    import numpy as np
+
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32)
+
+
+def _gather(indptr, indices, rows):
+    """The concatenated slices of `indices` for each of `rows`."""
+    import numpy as np
+
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return indices[:0]
+    # Position i of the output reads indices[starts[row] + (i - offset of row)].
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.repeat(starts - offsets, lengths) + np.arange(total)
+    return indices[positions]
+
+
+@dataclass
+class CollaboratorGraph:
+    user_ids: object  # sorted user ids; a user's position is their row
+    friend_indptr: object
+    friend_indices: object
+    project_indptr: object  # user -> projects
+    project_indices: object
+    member_indptr: object  # project -> users
+    member_indices: object
+    built_at: float
+
+    @classmethod
+    def from_edges(cls, user_ids, friendships, memberships):
+        """
+        Builds the graph from arrays of user ids, (user_id, friend_id)
+        pairs listing each friendship in both directions, and (user_id,
+        project_id) pairs.
+        """
+        import numpy as np
+
+        user_ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+        friendships = np.asarray(friendships, dtype=np.int64).reshape(-1, 2)
+        memberships = np.asarray(memberships, dtype=np.int64).reshape(-1, 2)
+        # Pairs pointing at users outside user_ids (e.g. created mid-build) are dropped.
+        friendships = friendships[np.isin(friendships, user_ids).all(axis=1)]
+        memberships = memberships[np.isin(memberships[:, 0], user_ids)]
+
+        n_users = len(user_ids)
+        friend_rows = np.searchsorted(user_ids, friendships[:, 0])
+        friend_cols = np.searchsorted(user_ids, friendships[:, 1])
+        member_rows = np.searchsorted(user_ids, memberships[:, 0])
+        _, project_rows = np.unique(memberships[:, 1], return_inverse=True)
+        n_projects = int(project_rows.max()) + 1 if len(project_rows) else 0
+
+        friend_indptr, friend_indices = _csr(friend_rows, friend_cols, n_users)
+        project_indptr, project_indices = _csr(member_rows, project_rows, n_users)
+        member_indptr, member_indices = _csr(project_rows, member_rows, n_projects)
+        return cls(user_ids, friend_indptr, friend_indices, project_indptr, project_indices,
+                   member_indptr, member_indices, time.time())
+
+    def _row(self, user_id):
+        import numpy as np
+
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    def suggest(self, user_id, exclude_ids=(), limit=10):
+        """
+        The best `limit` Suggestions for `user_id`: neither the user, a
+        friend of theirs, nor anyone in `exclude_ids`. Ranked by score,
+        then by mutual friends, then by user id.
+        """
+        import numpy as np
+
+        row = self._row(user_id)
+        if row is None:
+            return []
+        friends = self.friend_indices[self.friend_indptr[row]:self.friend_indptr[row + 1]]
+        projects = self.project_indices[self.project_indptr[row]:self.project_indptr[row + 1]]
+
+        # Counting into arrays over every user is cheaper than sorting the
+        # neighbourhood, which runs to 10^5 entries for friends of popular users.
+        n_users = len(self.user_ids)
+        mutual_friends = np.bincount(_gather(self.friend_indptr, self.friend_indices, friends), minlength=n_users)
+        shared_projects = np.bincount(_gather(self.member_indptr, self.member_indices, projects), minlength=n_users)
+        scores = mutual_friends + shared_projects
+
+        scores[row] = 0
+        scores[friends] = 0
+        if exclude_ids:
+            excluded = np.asarray(list(exclude_ids), dtype=np.int64)
+            excluded = np.searchsorted(self.user_ids, excluded[np.isin(excluded, self.user_ids)])
+            scores[excluded] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            # Narrow to the top `limit` scores (plus ties) before the full sort.
+            cutoff = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[scores[candidates] >= cutoff]
+        best = candidates[np.lexsort((candidates, -mutual_friends[candidates], -scores[candidates]))][:limit]
+        return [
+            Suggestion(int(self.user_ids[i]), int(mutual_friends[i]), int(shared_projects[i]))
+            for i in best
+        ]
+
+    def save(self, path):
+        import numpy as np
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so a loading process never sees half a graph.
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                np.savez(fh, version=GRAPH_VERSION, built_at=self.built_at, **{
+                    name: getattr(self, name) for name in (
+                        'user_ids', 'friend_indptr', 'friend_indices', 'project_indptr',
+                        'project_indices', 'member_indptr', 'member_indices',
+                    )
+                })
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path) as data:
+            if int(data['version']) != GRAPH_VERSION:
+                return None
+            arrays = {name: data[name] for name in data.files if name not in ('version', 'built_at')}
+            return cls(built_at=float(data['built_at']), **arrays)
+
+
+def build_graph():
+    """Snapshots the current friendships and memberships into a CollaboratorGraph."""
+    import numpy as np
+    from django.contrib.auth.models import User
+
+    from users.models import Friendship
+    from .models import Project, ProjectMembership
+
+    def pairs(queryset, *fields):
+        rows = queryset.order_by().values_list(*fields).iterator(chunk_size=10_000)
+        return np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+
+    user_ids = np.fromiter(User.objects.order_by().values_list('id', flat=True).iterator(chunk_size=10_000), dtype=np.int64)
+    memberships = np.concatenate([
+        pairs(ProjectMembership.objects, 'user_id', 'project_id'),
+        pairs(Project.objects, 'owner_id', 'id'),
+    ])
+    return CollaboratorGraph.from_edges(user_ids, pairs(Friendship.objects, 'user_id', 'friend_id'), memberships)
+
+
+def rebuild():
+    """Builds the graph and replaces the one at COLLABORATOR_GRAPH_PATH."""
+    graph = build_graph()
+    graph.save(settings.COLLABORATOR_GRAPH_PATH)
+    return graph
+
+
+def get_graph():
+    """The saved graph, loaded once per process and again whenever it is rebuilt; None if there is none."""
+    path = settings.COLLABORATOR_GRAPH_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, CollaboratorGraph.load(path))
+            _loaded[path] = cached
+    return cached[1]
+
+
+def suggest_from_database(user, exclude_ids=(), limit=10):
+    """
+    suggest() computed with aggregate queries over the live tables: the
+    fallback for when no graph file exists, slower for well-connected users.
+    """
+    from django.db.models import Count, Q
+
+    from users.models import Friendship
+    from .models import Project, ProjectMembership
+
+    friend_ids = set(Friendship.objects.filter(user=user).values_list('friend_id', flat=True))
+    mutual_friends = dict(
+        Friendship.objects.filter(user_id__in=friend_ids)
+        .order_by().values_list('friend_id').annotate(n=Count('id'))
+    )
+    projects = Project.objects.filter(Q(owner=user) | Q(id__in=ProjectMembership.objects.filter(user=user).values('project')))
+    shared_projects = dict(
+        ProjectMembership.objects.filter(project__in=projects)
+        .order_by().values_list('user_id').annotate(n=Count('id'))
+    )
+    for owner_id, n in projects.order_by().values_list('owner_id').annotate(n=Count('id')):
+        shared_projects[owner_id] = shared_projects.get(owner_id, 0) + n
+
+    skipped = {user.id} | friend_ids | set(exclude_ids)
+    suggestions = [
+        Suggestion(user_id, mutual_friends.get(user_id, 0), shared_projects.get(user_id, 0))
+        for user_id in (mutual_friends.keys() | shared_projects.keys()) - skipped
+    ]
+    suggestions.sort(key=lambda s: (-s.score, -s.mutual_friends, s.user_id))
+    return suggestions[:limit]
+
+
+def suggest_collaborators(user, exclude_ids=(), limit=10):
+    graph = get_graph()
+    if graph is None:
+        logger.warning(
+            'No collaborator graph at %s; run `manage.py rebuild_collaborator_graph`. '
+            'Suggesting from the database meanwhile.', settings.COLLABORATOR_GRAPH_PATH,
+        )
+        return suggest_from_database(user, exclude_ids, limit)
+    return graph.suggest(user.id, exclude_ids, limit)
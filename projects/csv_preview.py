@@ -0,0 +1,229 @@
+"""
+CSV previews for the file viewer.
+
+pandas and plotly are only needed here and together cost hundreds of
+milliseconds and tens of MB to import, so they are imported on first use
+instead of whenever projects.views is loaded (every worker, every manage.py
+command).
+
+Uploaded files can be hundreds of MB, so the preview never loads a whole
+file: the table comes from the first few rows and the chart from a uniform
+random sample of the first two columns, collected chunk by chunk under a
+memory and a time budget. When a budget runs out the preview is still
+rendered from what was read and flagged as truncated.
+
+The sample is then downsampled to CHART_POINTS before the figure is built,
+since plotly embeds every point in the page: Largest-Triangle-Three-Buckets
+when x is ordered (a series), min/max binning on x otherwise (a cloud).
+"""
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+# Overridable through settings.CSV_PREVIEW
+PREVIEW_DEFAULTS = {
+    'HEAD_ROWS': 5,
+    'SAMPLE_POINTS': 50000,
+    'CHART_POINTS': 2000,
+    'MEMORY_BUDGET_MB': 64,
+    'TIME_BUDGET_SECONDS': 5.0,
+}
+
+# Bump whenever the rendered output changes so cached previews are rebuilt.
+RENDERER_VERSION = 2
+
+# The C parser holds raw tokens next to the parsed values, so a chunk needs
+# a few times its final in-memory size while it is being read.
+PARSE_OVERHEAD = 4
+
+
+@dataclass
+class CsvPreview:
+    data_html: str = None
+    chart_html: str = None
+    error_message: str = None
+    rows_scanned: int = 0
+    points_kept: int = 0
+    truncated_reason: str = None
+    # 'lttb', 'minmax', 'stride' or None when every sampled point is drawn
+    downsample_method: str = None
+    # [[column name, pandas dtype], ...] as seen in the head rows
+    schema: list = None
+    # {'x': name, 'y': name, 'x_values': [...], 'y_values': [...]}
+    chart_data: dict = None
+
+    @property
+    def truncated(self):
+        return self.truncated_reason is not None
+
+
+def get_preview_options(**overrides):
+    options = {**PREVIEW_DEFAULTS, **getattr(settings, 'CSV_PREVIEW', {})}
+    options.update(overrides)
+    return options
+
+
+def _estimate_row_bytes(frame):
+    """In-memory size of one parsed row, measured on the head sample."""
+    if len(frame) == 0:
+        return 64
+    return max(16, int(frame.memory_usage(index=False, deep=True).sum() / len(frame)))
+
+
+def sample_two_columns(file_path, row_bytes, options):
+    """
+    Streams the first two columns of a CSV and keeps a uniform random sample
+    of at most SAMPLE_POINTS rows (bottom-k sampling on random keys, which
+    vectorises per chunk). Returns (frame, rows_scanned, truncated_reason);
+    the frame keeps the rows in file order.
+    """
+    import numpy as np
+    import pandas as pd
+
+    budget_bytes = int(options['MEMORY_BUDGET_MB'] * 1024 * 1024)
+    truncated_reason = None
+
+    # The sample and one parsed chunk must both fit in the memory budget.
+    sample_size = options['SAMPLE_POINTS']
+    if sample_size * row_bytes > budget_bytes // 2:
+        sample_size = max(1, budget_bytes // 2 // row_bytes)
+        truncated_reason = f"chart sample limited to {sample_size} points by the memory budget"
+    chunk_rows = max(1000, budget_bytes // 2 // (row_bytes * PARSE_OVERHEAD))
+
+    rng = np.random.default_rng()
+    deadline = time.monotonic() + options['TIME_BUDGET_SECONDS']
+    sample = None
+    rows_scanned = 0
+
+    for chunk in pd.read_csv(file_path, usecols=[0, 1], chunksize=chunk_rows):
+        chunk = chunk.assign(_row=np.arange(rows_scanned, rows_scanned + len(chunk)), _key=rng.random(len(chunk)))
+        rows_scanned += len(chunk)
+
+        candidates = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        if len(candidates) > sample_size:
+            keep = np.argpartition(candidates['_key'].to_numpy(), sample_size - 1)[:sample_size]
+            candidates = candidates.iloc[keep]
+        sample = candidates
+
+        if time.monotonic() > deadline:
+            truncated_reason = f"stopped reading after {rows_scanned} rows to stay within the time budget"
+            break
+
+    if sample is None:
+        return pd.DataFrame(), 0, truncated_reason
+    sample = sample.sort_values('_row').drop(columns=['_row', '_key']).reset_index(drop=True)
+    return sample, rows_scanned, truncated_reason
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets over points ordered by x. Returns the
+    indices of the n_out points kept, always including the first and last.
+    Each bucket is scored with NumPy; only the walk across buckets is a loop,
+    since every choice depends on the previous one.
+    """
+    import numpy as np
+
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        next_end = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(area.argmax())
+        kept[b + 1] = prev
+    return kept
+
+
+def minmax_bins(x, y, n_out):
+    """
+    Splits the x range into n_out // 2 equal bins and keeps the lowest and
+    highest point of each, so outliers survive. Returns sorted indices.
+    """
+    import numpy as np
+
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+
+    n_bins = max(1, n_out // 2)
+    span = x.max() - x.min()
+    bins = np.zeros(n, dtype=int) if span == 0 else np.minimum(((x - x.min()) / span * n_bins).astype(int), n_bins - 1)
+
+    order = np.lexsort((y, bins))
+    sorted_bins = bins[order]
+    first = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.concatenate([order[first], order[last]]))
+
+
+def downsample(points, n_out):
+    """
+    Reduces a two-column frame to at most n_out rows for plotting.
+    Returns (frame, method), method being None when nothing was dropped.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if len(points) <= n_out:
+        return points, None
+
+    x_col, y_col = points.columns[0], points.columns[1]
+    if not (pd.api.types.is_numeric_dtype(points[x_col]) and pd.api.types.is_numeric_dtype(points[y_col])):
+        # Categories or text: no geometry to preserve, keep an even stride.
+        keep = np.linspace(0, len(points) - 1, n_out).astype(int)
+        return points.iloc[keep].reset_index(drop=True), 'stride'
+
+    clean = points.dropna(subset=[x_col, y_col]).reset_index(drop=True)
+    x = clean[x_col].to_numpy(dtype=float)
+    y = clean[y_col].to_numpy(dtype=float)
+    if len(x) > 1 and np.all(np.diff(x) >= 0):
+        return clean.iloc[lttb(x, y, n_out)].reset_index(drop=True), 'lttb'
+    return clean.iloc[minmax_bins(x, y, n_out)].reset_index(drop=True), 'minmax'
+
+
+def build_csv_preview(file_path, title, **overrides):
+    """Renders the head of a CSV as a table and a sample of its first two columns as a scatter chart."""
+    import pandas as pd
+    import plotly.express as px
+
+    options = get_preview_options(**overrides)
+    preview = CsvPreview()
+
+    head = pd.read_csv(file_path, nrows=options['HEAD_ROWS'])
+    preview.data_html = head.to_html(classes='table table-striped table-bordered', index=False)
+    preview.schema = [[str(name), str(dtype)] for name, dtype in head.dtypes.items()]
+
+    if len(head.columns) < 2:
+        preview.error_message = "Cannot generate a 2D chart: The CSV file has fewer than two columns."
+        return preview
+
+    row_bytes = _estimate_row_bytes(head.iloc[:, :2])
+    points, preview.rows_scanned, preview.truncated_reason = sample_two_columns(file_path, row_bytes, options)
+    if len(points) == 0:
+        preview.error_message = "Cannot generate a chart: The CSV file has no data rows."
+        return preview
+
+    points, preview.downsample_method = downsample(points, options['CHART_POINTS'])
+    preview.points_kept = len(points)
+
+    x, y = points.columns[0], points.columns[1]
+    preview.chart_data = {
+        'x': str(x), 'y': str(y),
+        'x_values': points[x].tolist(), 'y_values': points[y].tolist(),
+    }
+    fig = px.scatter(points, x=x, y=y, title=title)
+    preview.chart_html = fig.to_html(full_html=False, include_plotlyjs='cdn')
+    return preview
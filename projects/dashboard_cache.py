@@ -0,0 +1,60 @@
+"""
+Versioned fragment caching for the dashboard panels.
+
+Each panel the dashboard view renders sits in a {% cache %} block keyed
+by the user and a per-user version number for that panel. The receivers
+in projects.signals bump a panel's version whenever a model feeding it
+changes, which orphans the cached fragment, so the next render misses and
+stores a fresh one. A warm dashboard is one get_many for the versions
+plus one get per panel; the view hands the panels lazy querysets, which
+only run on a miss.
+
+DASHBOARD_FRAGMENT_SECONDS bounds how long a fragment lives, and so how
+stale its relative times ("5 minutes ago") and other users' names get.
+A bump only reaches other processes through a cache they share, so on a
+per-process backend (LocMemCache) fragments are not cached at all.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+PANELS = ('friends', 'friend_requests', 'invitations', 'projects', 'activity')
+
+
+def shared_backend():
+    """Whether the default cache is one other processes see, so version bumps reach them."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def fragment_seconds():
+    """How long a panel fragment is cached: 0, so never, when other workers couldn't see its version move."""
+    return settings.DASHBOARD_FRAGMENT_SECONDS if shared_backend() else 0
+
+
+def _key(panel, user_id):
+    return f'dashboard-version:{panel}:{user_id}'
+
+
+def versions(user):
+    """{panel: version} for `user`, seeding any versions the cache lacks."""
+    keys = {panel: _key(panel, user.pk) for panel in PANELS}
+    found = cache.get_many(keys.values())
+    # A fresh seed is larger than any version the key held before it was
+    # evicted, so it can never match a fragment cached under an old one.
+    missing = {key: time.time_ns() for key in keys.values() if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {panel: found[key] for panel, key in keys.items()}
+
+
+def bump(panel, user_ids):
+    """Invalidates `panel` for each of `user_ids`."""
+    for user_id in set(user_ids):
+        try:
+            cache.incr(_key(panel, user_id))
+        except ValueError:
+            # No version yet, so nothing is cached under one; the next read seeds it.
+            pass
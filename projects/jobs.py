@@ -0,0 +1,126 @@
+"""
+A small database-backed job queue.
+
+Jobs are rows in the Job table, so there is no broker to run: any number of
+`manage.py run_jobs` processes on the box poll the table, claim a job with a
+conditional UPDATE (only one worker can flip a row from queued to running)
+and call the function it names. A failing job is retried with exponential
+backoff until max_attempts, and a job whose worker died is reclaimed once
+its lock is older than JOBS_LOCK_TIMEOUT_SECONDS.
+
+Without a worker (JOBS_WORKER off, the default outside the Docker image)
+enqueue runs the job at once in the calling process instead, so nothing
+waits on a queue no one is reading.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (Job.Status.QUEUED, Job.Status.RUNNING)
+
+
+def _func_path(func):
+    return func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+
+
+def _is_stale(job):
+    stale = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT_SECONDS)
+    return job.status == Job.Status.RUNNING and job.locked_at is not None and job.locked_at < stale
+
+
+def enqueue(func, key='', max_attempts=3, **payload):
+    """
+    Queues `func(**payload)` for a worker. When `key` is given and the latest
+    job with that key is still queued or running, that job is returned
+    instead; if it failed, or its worker died, it is reset and queued again.
+    """
+    job = latest_for_key(key) if key else None
+    if job is not None and (job.status == Job.Status.FAILED or _is_stale(job)):
+        job.func, job.payload, job.max_attempts = _func_path(func), payload, max_attempts
+        job.status, job.attempts, job.run_after = Job.Status.QUEUED, 0, timezone.now()
+        job.locked_by, job.locked_at, job.finished_at, job.last_error = '', None, None, ''
+        job.save()
+    elif job is None or job.status not in ACTIVE_STATUSES:
+        job = Job.objects.create(func=_func_path(func), payload=payload, key=key, max_attempts=max_attempts)
+    if not settings.JOBS_WORKER:
+        job = _run_inline(job)
+    return job
+
+
+def _run_inline(job):
+    """Runs `job` and its retries now, skipping the backoff; leaves it alone if someone else holds it."""
+    while True:
+        claimed = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, locked_by='inline', locked_at=timezone.now(),
+        )
+        if not claimed:
+            return job
+        job.refresh_from_db()
+        job = run_job(job)
+
+
+def latest_for_key(key):
+    return Job.objects.filter(key=key).order_by('-id').first()
+
+
+def claim_next(worker_id):
+    """Atomically takes the oldest runnable job, or returns None."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT_SECONDS)
+    runnable = (
+        Q(status=Job.Status.QUEUED, run_after__lte=now)
+        | Q(status=Job.Status.RUNNING, locked_at__lt=stale)
+    )
+    for job_id in Job.objects.filter(runnable).order_by('run_after', 'id').values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(Q(pk=job_id) & runnable).update(
+            status=Job.Status.RUNNING, locked_by=worker_id, locked_at=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Runs a claimed job and records the outcome, scheduling a retry on failure."""
+    job.attempts += 1
+    try:
+        import_string(job.func)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+            logger.exception('Job %s (%s) failed for good after %s attempts', job.pk, job.func, job.attempts)
+        else:
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=settings.JOBS_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+            logger.warning('Job %s (%s) failed, retrying', job.pk, job.func)
+    else:
+        job.status = Job.Status.DONE
+        job.finished_at = timezone.now()
+        job.last_error = ''
+    job.locked_by = ''
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def run_pending(worker_id='inline', limit=None):
+    """Runs runnable jobs until none are left (or `limit` ran). Returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
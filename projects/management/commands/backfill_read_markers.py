@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.read_tracking import backfill_from_read_by, markers_behind_read_by
+
+
+class Command(BaseCommand):
+    help = 'Seeds read watermarks from the legacy read_by tables; safe to re-run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only check that no watermark is behind a read_by receipt; exits non-zero if one is.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            start = time.perf_counter()
+            backfill_from_read_by()
+            self.stdout.write(f"Watermarks backfilled in {time.perf_counter() - start:.2f}s")
+
+        behind = {kind: n for kind, n in markers_behind_read_by().items() if n}
+        if behind:
+            details = ', '.join(f'{n} {kind}' for kind, n in behind.items())
+            raise CommandError(f"Watermarks behind their read_by receipts: {details}")
+        self.stdout.write(self.style.SUCCESS("Every read_by receipt is covered by a watermark."))
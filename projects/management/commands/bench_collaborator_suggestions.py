@@ -0,0 +1,78 @@
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from projects.collaborator_graph import CollaboratorGraph
+
+
+class Command(BaseCommand):
+    help = (
+        'Times building, loading and querying the collaborator graph on a synthetic network. '
+        'Needs no database: the edges are generated in memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--friends', type=int, default=20, help='Average friends per user.')
+        parser.add_argument('--projects', type=int, default=20_000)
+        parser.add_argument('--members', type=int, default=6, help='Average members per project.')
+        parser.add_argument('--queries', type=int, default=2000)
+
+    def generate(self, options):
+        import numpy as np
+
+        rng = np.random.default_rng(42)
+        users, projects = options['users'], options['projects']
+        # Preferential attachment-ish: a few users get far more friends than average.
+        popularity = rng.zipf(2.0, users).astype(float)
+        popularity /= popularity.sum()
+        count = users * options['friends'] // 2
+        a = rng.integers(0, users, count)
+        b = rng.choice(users, count, p=popularity)
+        pairs = np.unique(np.sort(np.stack([a, b], axis=1)[a != b], axis=1), axis=0)
+        friendships = np.concatenate([pairs, pairs[:, ::-1]]) + 1
+
+        member_count = projects * options['members']
+        memberships = np.stack([rng.integers(1, users + 1, member_count), rng.integers(1, projects + 1, member_count)], axis=1)
+        return np.arange(1, users + 1), friendships, np.unique(memberships, axis=0)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        user_ids, friendships, memberships = self.generate(options)
+        self.stdout.write(
+            f"Generated {len(user_ids)} users, {len(friendships) // 2} friendships and "
+            f"{len(memberships)} memberships in {time.perf_counter() - start:.1f}s"
+        )
+
+        start = time.perf_counter()
+        graph = CollaboratorGraph.from_edges(user_ids, friendships, memberships)
+        self.stdout.write(f"Built CSR graph in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'graph.npz'
+            start = time.perf_counter()
+            graph.save(path)
+            saved_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            graph = CollaboratorGraph.load(path)
+            loaded_ms = (time.perf_counter() - start) * 1000
+            size_mb = path.stat().st_size / 1024 / 1024
+        self.stdout.write(f"Saved in {saved_ms:.0f} ms ({size_mb:.1f} MB), loaded in {loaded_ms:.0f} ms")
+
+        rng = random.Random(42)
+        samples, candidates = [], []
+        for user_id in rng.sample(range(1, options['users'] + 1), min(options['queries'], options['users'])):
+            start = time.perf_counter()
+            suggestions = graph.suggest(user_id, limit=10)
+            samples.append((time.perf_counter() - start) * 1000)
+            candidates.append(len(suggestions))
+        samples.sort()
+        self.stdout.write(
+            f"suggest() over {len(samples)} users: median {statistics.median(samples):.2f} ms, "
+            f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f} ms, max {samples[-1]:.2f} ms "
+            f"(avg {statistics.mean(candidates):.1f} suggestions)"
+        )
@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory
+from django.urls import reverse
+
+from projects import views
+from projects.models import Comment, Project, ProjectFile, ProjectMembership, ReadMarker, Task
+from projects.read_tracking import unread_count
+
+BENCH_PREFIX = 'bench-mark-read-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Times POST mark-read on projects with growing numbers of unread items and reports '
+        'the queries it runs. Run it against a scratch database, e.g. '
+        'DATABASE_URL=sqlite:////tmp/bench.sqlite3 python manage.py migrate && ... bench_mark_read --scratch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1_000, 10_000],
+                            help='Unread items per project, split evenly across tasks, comments and files.')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic data afterwards.')
+        parser.add_argument('--scratch', action='store_true',
+                            help='Confirm the configured database is a scratch one the benchmark may fill.')
+
+    def make_project(self, owner, reader, size):
+        project = Project.objects.create(title=f'{BENCH_PREFIX}{size}', owner=owner)
+        ProjectMembership.objects.create(project=project, user=reader, role='viewer')
+        per_kind = size // 3
+        with transaction.atomic():
+            Task.objects.bulk_create(
+                [Task(project=project, title=f'task {i}', created_by=owner) for i in range(per_kind)], batch_size=2000)
+            Comment.objects.bulk_create(
+                [Comment(project=project, author=owner, body=f'comment {i}') for i in range(per_kind)], batch_size=2000)
+            ProjectFile.objects.bulk_create(
+                [ProjectFile(project=project, uploaded_by=owner, file=f'project_files/bench-{i}.csv')
+                 for i in range(size - 2 * per_kind)], batch_size=2000)
+        return project
+
+    def handle(self, *args, **options):
+        database = connection.settings_dict['NAME']
+        if not options['scratch']:
+            raise CommandError(
+                f'This writes synthetic users, projects, tasks, comments and files to the configured database '
+                f'({database}). Point DATABASE_URL at a scratch database and pass --scratch to confirm.'
+            )
+
+        factory = RequestFactory()
+
+        self.stdout.write(f"{'unread items':>14}{'queries':>10}{'writes':>9}{'ms':>9}{'unread after':>15}")
+        try:
+            owner, _ = User.objects.get_or_create(username=f'{BENCH_PREFIX}owner')
+            reader, _ = User.objects.get_or_create(username=f'{BENCH_PREFIX}reader')
+            for size in options['sizes']:
+                project = self.make_project(owner, reader, size)
+                unread = sum(unread_count(reader, project, kind) for kind in ReadMarker.Kind)
+                request = factory.post(reverse('mark-project-read', args=[project.id]))
+                request.user = reader
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    views.mark_project_read(request, project.id)
+                    elapsed = (time.perf_counter() - start) * 1000
+                # The view's statements, without the savepoint bookkeeping.
+                statements = [q['sql'] for q in queries if 'SAVEPOINT' not in q['sql'].upper()]
+                writes = [sql for sql in statements if sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+                left = sum(unread_count(reader, project, kind) for kind in ReadMarker.Kind)
+                self.stdout.write(f"{unread:>14}{len(statements):>10}{len(writes):>9}{elapsed:>9.1f}{left:>15}")
+        finally:
+            # Also after a failed or interrupted run, so no synthetic data is left behind.
+            if not options['keep']:
+                Project.objects.filter(title__startswith=BENCH_PREFIX).delete()
+                User.objects.filter(username__startswith=BENCH_PREFIX).delete()
@@ -0,0 +1,63 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: load the WSGI app and the URLconf (which imports
+# every views module), exactly what a gunicorn worker does before its first request.
+CHILD_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in {preload!r}:
+    __import__(name)
+import chimera_core.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'pandas_loaded': 'pandas' in sys.modules,
+}}))
+"""
+
+SCENARIOS = {
+    # The old projects.views imported these at module level
+    'eager pandas/plotly (before)': ['pandas', 'plotly.express'],
+    'lazy csv preview (after)': [],
+}
+
+
+class Command(BaseCommand):
+    help = 'Measures import time and peak RSS of chimera_core.wsgi with and without eager pandas/plotly imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start per scenario.')
+
+    def run_child(self, preload):
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT.format(preload=preload)],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        self.stdout.write(f"Starting {runs} fresh interpreter(s) per scenario...")
+
+        for name, preload in SCENARIOS.items():
+            samples = [self.run_child(preload) for _ in range(runs)]
+            seconds = statistics.median(s['seconds'] for s in samples)
+            rss_mb = statistics.median(s['max_rss_kb'] for s in samples) / 1024
+            self.stdout.write(
+                f"{name:<30} import {seconds * 1000:8.1f} ms   peak RSS {rss_mb:7.1f} MB   "
+                f"pandas loaded: {samples[0]['pandas_loaded']}"
+            )
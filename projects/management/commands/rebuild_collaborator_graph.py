@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.collaborator_graph import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the friendship and membership graph behind suggested collaborators. '
+        'Run it periodically (e.g. hourly from cron); web processes pick up the new file on their next lookup.'
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        graph = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Graph of {len(graph.user_ids)} users, {len(graph.friend_indices) // 2} friendships and "
+            f"{len(graph.member_indptr) - 1} projects written to {settings.COLLABORATOR_GRAPH_PATH} "
+            f"in {time.perf_counter() - start:.2f}s"
+        ))
@@ -0,0 +1,39 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (CSV previews, ...) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run every runnable job, then exit.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True  # finish the current job, then exit
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Worker {worker_id} started.")
+        while not stopping:
+            job = jobs.claim_next(worker_id)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            job = jobs.run_job(job)
+            self.stdout.write(f"Job {job.pk} {job.func}: {job.status}")
+        self.stdout.write(f"Worker {worker_id} stopped.")
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0022_alter_personaltodo_options_personaltodo_due_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadMarker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Task'), ('comment', 'Comment'), ('file', 'File')], max_length=10)),
+                ('last_read_id', models.BigIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['project', 'id'], name='projects_co_project_4c5cd5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectfile',
+            index=models.Index(fields=['project', 'id'], name='projects_pr_project_bf233a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'id'], name='projects_ta_project_50bba9_idx'),
+        ),
+        migrations.AddField(
+            model_name='readmarker',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_markers', to='projects.project'),
+        ),
+        migrations.AddField(
+            model_name='readmarker',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_markers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='readmarker',
+            unique_together={('user', 'project', 'kind')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0023_readmarker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfile',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
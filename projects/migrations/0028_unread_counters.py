@@ -0,0 +1,81 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# kind -> (model, field holding the item's author), as in read_tracking.TRACKED_KINDS
+TRACKED_KINDS = {
+    'task': ('Task', 'created_by'),
+    'comment': ('Comment', 'author'),
+    'file': ('ProjectFile', 'uploaded_by'),
+}
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Computes the new counters from the existing watermarks and access
+    requests, like read_tracking.rebuild_unread_counts(), so the badges are
+    right as soon as the columns exist.
+    """
+    Project = apps.get_model('projects', 'Project')
+    ProjectMembership = apps.get_model('projects', 'ProjectMembership')
+    ReadMarker = apps.get_model('projects', 'ReadMarker')
+    AccessRequest = apps.get_model('projects', 'AccessRequest')
+
+    # Every owner and member needs a marker to hold their count.
+    members = set(Project.objects.values_list('owner_id', 'id'))
+    members.update(ProjectMembership.objects.values_list('user_id', 'project_id'))
+    ReadMarker.objects.bulk_create(
+        [
+            ReadMarker(user_id=user_id, project_id=project_id, kind=kind)
+            for user_id, project_id in members
+            for kind in TRACKED_KINDS
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    for kind, (model_name, author_field) in TRACKED_KINDS.items():
+        unread = (
+            apps.get_model('projects', model_name).objects
+            .filter(project=OuterRef('project'), id__gt=OuterRef('last_read_id'))
+            .exclude(**{f'{author_field}_id': OuterRef('user_id')})
+            .order_by()
+            .values('project')
+            .annotate(n=Count('id'))
+            .values('n')
+        )
+        ReadMarker.objects.filter(kind=kind).update(unread_count=Coalesce(Subquery(unread), 0))
+
+    pending = (
+        AccessRequest.objects
+        .filter(project=OuterRef('pk'), status='pending')
+        .order_by()
+        .values('project')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    Project.objects.update(pending_requests_count=Coalesce(Subquery(pending), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0027_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='pending_requests_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='readmarker',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # The counters are dropped with their columns when migrating backwards.
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# SQLite: an FTS5 table holding a copy of each project's title and
+# description under the project's id; projects.signals keeps it in sync.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE projects_project_fts USING fts5(
+        title, description, tokenize='porter unicode61', prefix='2 3'
+    )""",
+    """INSERT INTO projects_project_fts(rowid, title, description)
+        SELECT id, title, COALESCE(description, '') FROM projects_project""",
+]
+SQLITE_REVERSE = ["DROP TABLE IF EXISTS projects_project_fts"]
+
+# Postgres: a GIN expression index, which needs no upkeep; the expression
+# must stay identical to projects.search.POSTGRES_DOCUMENT.
+POSTGRES_FORWARD = [
+    """CREATE INDEX projects_project_search_idx ON projects_project USING GIN ((
+        setweight(to_tsvector('simple', title), 'A')
+        || setweight(to_tsvector('simple', COALESCE(description, '')), 'B')
+    ))""",
+]
+POSTGRES_REVERSE = ["DROP INDEX IF EXISTS projects_project_search_idx"]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0028_unread_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
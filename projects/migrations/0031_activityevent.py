@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_activity(apps, schema_editor):
+    """One event per existing task, comment and file, stamped with its creation time."""
+    ActivityEvent = apps.get_model('projects', 'ActivityEvent')
+    sources = [
+        ('task', apps.get_model('projects', 'Task'), 'created_by_id', 'title', 'created_at'),
+        ('comment', apps.get_model('projects', 'Comment'), 'author_id', 'body', 'created_at'),
+        ('file', apps.get_model('projects', 'ProjectFile'), 'uploaded_by_id', 'file', 'uploaded_at'),
+    ]
+    for kind, model, actor, summary, created_at in sources:
+        rows = model.objects.order_by().values_list('id', 'project_id', actor, summary, created_at)
+        batch = []
+        for pk, project_id, actor_id, text, when in rows.iterator(chunk_size=2000):
+            if kind == 'file':
+                text = text.removeprefix('project_files/')
+            batch.append(ActivityEvent(
+                project_id=project_id, actor_id=actor_id, kind=kind, object_id=pk,
+                summary=text[:255], created_at=when,
+            ))
+            if len(batch) >= 2000:
+                ActivityEvent.objects.bulk_create(batch)
+                batch = []
+        ActivityEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_list_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Task'), ('comment', 'Comment'), ('file', 'File')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('summary', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'created_at', 'id'], name='projects_ac_project_8e5de1_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0031_activityevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activityevent',
+            index=models.Index(fields=['kind', 'object_id'], name='projects_ac_kind_db235d_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 class Project(models.Model):
     title = models.CharField(max_length=200)
@@ -11,13 +13,15 @@ class Project(models.Model):
         related_name='collaborations'
     )
     is_public = models.BooleanField(default=False)
+    # Kept up to date by read_tracking.refresh_pending_requests
+    pending_requests_count = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    @property
+    @cached_property
     def members(self):
-        """Returns a queryset of all members (owner + collaborators)."""
+        """Returns a list of all members (owner + collaborators), loaded once per instance."""
         return [self.owner] + list(self.collaborators.all())
 
     def __str__(self):
@@ -27,12 +31,24 @@ class Task(models.Model):
     title = models.CharField(max_length=200)
     is_completed = models.BooleanField(default=False)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
+    # Legacy read receipts, superseded by ReadMarker and no longer written. Kept
+    # until `manage.py backfill_read_markers --verify` passes in production;
+    # a later release drops them.
     read_by = models.ManyToManyField(User, related_name='read_tasks', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tasks')
     pinned_by = models.ManyToManyField(User, related_name='pinned_tasks', blank=True)
 
+    class Meta:
+        # Unread counts are a range scan over (project, id) above the reader's watermark;
+        # list pages are range scans over (project, sort key, id) from a cursor.
+        indexes = [
+            models.Index(fields=['project', 'id']),
+            models.Index(fields=['project', 'created_at', 'id']),
+            models.Index(fields=['project', 'title', 'id']),
+        ]
+
     @property
     def was_edited(self):
         # Check if edited_at is more than a second different from created_at
@@ -61,10 +77,11 @@ class Comment(models.Model):
     edited_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='comments')
-    read_by = models.ManyToManyField(User, related_name='read_comments', blank=True)
+    read_by = models.ManyToManyField(User, related_name='read_comments', blank=True)  # legacy, see Task.read_by
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['project', 'id']), models.Index(fields=['project', 'created_at', 'id'])]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.project.title}'
@@ -80,7 +97,12 @@ class ProjectFile(models.Model):
     file = models.FileField(upload_to='project_files/')
     description = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    read_by = models.ManyToManyField(User, related_name='read_files', blank=True)
+    read_by = models.ManyToManyField(User, related_name='read_files', blank=True)  # legacy, see Task.read_by
+    # sha256 of the file's bytes, filled in at upload; keys the preview cache
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'id']), models.Index(fields=['project', 'uploaded_at', 'id'])]
 
     def __str__(self):
         return self.file.name
@@ -225,3 +247,84 @@ class PersonalTodo(models.Model):
 
     def __str__(self):
         return self.title
+
+class ReadMarker(models.Model):
+    """
+    A per-user "read up to here" watermark for one kind of item in a project.
+    Every task, comment or file with an id at or below last_read_id counts as read.
+    unread_count caches how many items above the watermark others created, for the project cards.
+    """
+    class Kind(models.TextChoices):
+        TASK = 'task', 'Task'
+        COMMENT = 'comment', 'Comment'
+        FILE = 'file', 'File'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_markers')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='read_markers')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    last_read_id = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(default=timezone.now)
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'project', 'kind')
+
+    def __str__(self):
+        return f'{self.user.username} read {self.kind}s of {self.project.title} up to #{self.last_read_id}'
+
+
+class Job(models.Model):
+    """
+    A unit of background work run by `manage.py run_jobs`.
+    `func` is the dotted path of a module-level function called with `payload` as kwargs.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    func = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    # Identifies the work (e.g. "csv-preview:42") so it is never queued twice and can be polled.
+    key = models.CharField(max_length=200, blank=True, db_index=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f'{self.func} [{self.status}]'
+
+
+class ActivityEvent(models.Model):
+    """
+    A record of a task, comment or file being added to a project, carrying
+    what the dashboard feed shows so the feed never has to read the items
+    themselves. Written by projects.signals, which also keeps the summary
+    in step with edits and drops the event when its item is deleted.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='activity')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity')
+    kind = models.CharField(max_length=10, choices=ReadMarker.Kind.choices)
+    object_id = models.BigIntegerField()
+    # The task title, the start of the comment or the file name.
+    summary = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id']),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f'{self.actor_id} added {self.kind} #{self.object_id} to project {self.project_id}'
@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination for the task, comment and file lists.
+
+A page is addressed by the sort key (value, id) of the row it starts after
+or ends before, so fetching it is one index range scan of per_page + 1 rows
+however deep it is, where OFFSET reads and throws away every earlier row.
+The optional total comes from a short-lived cache instead of a COUNT(*) on
+every request, so it is an estimate for LIST_COUNT_CACHE_SECONDS after a
+change.
+"""
+import base64
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset. Iterates like a Paginator page."""
+
+    def __init__(self, object_list, number, per_page, has_next, has_previous,
+                 next_cursor='', previous_cursor='', count=None):
+        self.object_list = object_list
+        self.number = number
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor  # '' when the previous page is the first
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(self.number, math.ceil(self.count / self.per_page))
+
+
+def _encode(ordering, values, number, backwards):
+    raw = json.dumps([ordering, values, number, backwards], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode(cursor, ordering, model, field):
+    """(value, pk, number, backwards) from a cursor made for `ordering`, else None."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_ordering, (value, pk), number, backwards = json.loads(raw)
+        if cursor_ordering != ordering:
+            return None
+        value = model._meta.get_field(field).to_python(value)
+        return value, int(pk), max(int(number), 2), bool(backwards)
+    except (ValueError, TypeError, AttributeError):
+        # Covers bad base64, bad JSON, a wrong shape and values the field rejects.
+        return None
+
+
+def _cached_count(queryset, count_key):
+    key = 'keyset-count:' + hashlib.sha256(count_key.encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, settings.LIST_COUNT_CACHE_SECONDS)
+
+
+def paginate(queryset, ordering, cursor, per_page, count_key=None):
+    """
+    The page of `queryset`, sorted by `ordering` (a field name, '-' for
+    descending) with ties broken by id, that `cursor` points at; the first
+    page when cursor is empty or invalid. Pass `count_key`, a string naming
+    what the queryset selects, to get a cached total in page.count.
+    """
+    model = queryset.model
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    decoded = _decode(cursor, ordering, model, field) if cursor else None
+
+    forward_order = [ordering, '-pk' if descending else 'pk']
+    if decoded is None:
+        rows = list(queryset.order_by(*forward_order)[:per_page + 1])
+        number, has_previous, has_next = 1, False, len(rows) > per_page
+        rows = rows[:per_page]
+    else:
+        value, pk, number, backwards = decoded
+        # Rows after the cursor in display order, or before it when paging back.
+        lookup = 'lt' if descending != backwards else 'gt'
+        after = Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk})
+        order = forward_order
+        if backwards:
+            order = [term[1:] if term.startswith('-') else '-' + term for term in forward_order]
+        rows = list(queryset.filter(after).order_by(*order)[:per_page + 1])
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = True, more
+
+    def key(row):
+        return [getattr(row, field), row.pk]
+
+    next_cursor = _encode(ordering, key(rows[-1]), number + 1, False) if rows and has_next else ''
+    previous_cursor = ''
+    if rows and has_previous and number > 2:
+        previous_cursor = _encode(ordering, key(rows[0]), number - 1, True)
+
+    count = _cached_count(queryset, count_key) if count_key is not None else None
+    return KeysetPage(rows, number, per_page, has_next, has_previous, next_cursor, previous_cursor, count)
@@ -0,0 +1,69 @@
+"""
+Project-versioned caching for the HTMX list partials.
+
+Each project has a version number in the cache, incremented by the
+receivers in projects.signals on any write to its tasks, pins,
+assignments, comments, files, memberships, bans, access requests,
+reports or log. task_list, comment_list, file_list, request_inbox and
+inbox_preview cache what they render under (project, version, viewer,
+role, query string), so a refresh-lists trigger that finds the project
+unchanged is answered with two cache gets instead of the list queries.
+A write moves the version on and leaves the old entries to expire.
+
+Entries are per viewer, not just per role, since the lists show controls
+for the viewer's own comments, files and pins. PROJECT_PARTIAL_CACHE_SECONDS
+caps how long relative times ("5 minutes ago") and usernames in them can
+lag behind. As with the dashboard panels, a bump only reaches other
+processes through a cache they share, so nothing is cached on LocMemCache.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+from .dashboard_cache import shared_backend
+
+
+def _version_key(project_id):
+    return f'project-version:{project_id}'
+
+
+def version(project_id):
+    key = _version_key(project_id)
+    current = cache.get(key)
+    if current is None:
+        # Seeding with the clock puts the version past any it held before it
+        # was evicted, so entries cached under those stay unreachable.
+        cache.add(key, time.time_ns(), None)
+        current = cache.get(key)
+    return current
+
+
+def bump(project_id):
+    """Invalidates every cached partial of the project."""
+    try:
+        cache.incr(_version_key(project_id))
+    except ValueError:
+        # No version yet, so nothing is cached under one; the next read seeds it.
+        pass
+
+
+def get_or_build(request, project, role, partial, build):
+    """
+    What `build()` returned for this partial, project version, viewer, role
+    and query string, calling it on a miss. `build` must return something
+    picklable, typically the rendered HTML. Always calls it when the cache
+    is per-process, since another worker's bump would never be seen here.
+    """
+    if not shared_backend():
+        return build()
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    viewer = hashlib.sha256(f'{request.user.pk}:{role}:{query}'.encode()).hexdigest()
+    key = f'project-partial:{partial}:{project.pk}:{version(project.pk)}:{viewer}'
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, settings.PROJECT_PARTIAL_CACHE_SECONDS)
+    return result
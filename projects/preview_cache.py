@@ -0,0 +1,175 @@
+"""
+On-disk cache of computed CSV previews.
+
+A ProjectFile never changes after upload, so its preview is keyed by the
+sha256 of its bytes plus the renderer version and options. Entries are JSON
+files in CSV_PREVIEW_CACHE_DIR; reads bump the file's mtime, and writes
+evict the least recently used entries once the directory grows past
+CSV_PREVIEW_CACHE_MAX_MB.
+
+Previews are built off the request path by the job worker (see jobs.py):
+uploads queue one, and the file viewer polls until it is cached. Without a
+worker the first view builds it inline.
+"""
+import csv
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+
+from django.conf import settings
+
+from . import jobs
+from .csv_preview import RENDERER_VERSION, CsvPreview, build_csv_preview, get_preview_options
+from .models import Job, ProjectFile
+
+
+def file_content_hash(django_file):
+    """sha256 of a Django File / UploadedFile, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in django_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_dir():
+    return Path(settings.CSV_PREVIEW_CACHE_DIR)
+
+
+def _entry_path(content_hash, variant):
+    """`variant` holds everything besides the content that shapes the output."""
+    variant_key = hashlib.sha256(json.dumps(variant, sort_keys=True).encode()).hexdigest()[:12]
+    return _cache_dir() / f'{content_hash}-v{RENDERER_VERSION}-{variant_key}.json'
+
+
+def get(content_hash, variant):
+    path = _entry_path(content_hash, variant)
+    try:
+        with open(path, encoding='utf-8') as fh:
+            data = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        os.utime(path)  # mark as recently used
+    except OSError:
+        pass
+    return CsvPreview(**data)
+
+
+def put(content_hash, variant, preview):
+    directory = _cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temp file and rename so concurrent readers never see half an entry.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(asdict(preview), fh)
+        os.replace(tmp_path, _entry_path(content_hash, variant))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    evict(settings.CSV_PREVIEW_CACHE_MAX_MB * 1024 * 1024)
+
+
+def evict(max_bytes):
+    """Deletes least recently used entries until the cache fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(_cache_dir()):
+        if entry.name.endswith('.json'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def invalidate(content_hash):
+    """Drops every cached preview of the given content, whatever its version."""
+    if not content_hash or not _cache_dir().exists():
+        return
+    for path in _cache_dir().glob(f'{content_hash}-*.json'):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def preview_title(file_instance):
+    return f"Data from {file_instance.file.name}"
+
+
+def _ensure_hash(file_instance):
+    if not file_instance.content_hash:
+        # Uploaded before hashes were recorded: hash once and remember it.
+        file_instance.content_hash = file_content_hash(file_instance.file)
+        file_instance.save(update_fields=['content_hash'])
+
+
+def _variant(file_instance):
+    return {**get_preview_options(), 'title': preview_title(file_instance)}
+
+
+def cached_preview(file_instance):
+    """The cached CsvPreview of a ProjectFile, or None without computing anything."""
+    _ensure_hash(file_instance)
+    return get(file_instance.content_hash, _variant(file_instance))
+
+
+def get_or_build_preview(file_instance):
+    """
+    Returns the CsvPreview of a ProjectFile, computing and caching it on a miss.
+    A hit is one file read.
+    """
+    preview = cached_preview(file_instance)
+    if preview is None:
+        options = get_preview_options()
+        try:
+            preview = build_csv_preview(file_instance.file.path, preview_title(file_instance), **options)
+        except (csv.Error, UnicodeDecodeError, ValueError) as e:
+            # Malformed content fails the same way on every retry, so the
+            # error is cached as the preview and shown straight away.
+            preview = CsvPreview(error_message=f"Could not process file: {e}")
+        put(file_instance.content_hash, _variant(file_instance), preview)
+    return preview
+
+
+def preview_job_key(file_id):
+    return f'csv-preview:{file_id}'
+
+
+def request_preview(file_instance):
+    """Queues the preview of a ProjectFile for the job worker; returns the Job."""
+    return jobs.enqueue(
+        build_preview_job, key=preview_job_key(file_instance.pk),
+        file_id=file_instance.pk, renderer_version=RENDERER_VERSION,
+    )
+
+
+def failed_preview_job(file_instance):
+    """
+    The job that failed to build the file's preview with the current
+    renderer, or None. A renderer upgrade gives failed files a fresh try.
+    """
+    job = jobs.latest_for_key(preview_job_key(file_instance.pk))
+    if job is not None and job.status == Job.Status.FAILED and job.payload.get('renderer_version') == RENDERER_VERSION:
+        return job
+    return None
+
+
+def build_preview_job(file_id, renderer_version=None):
+    # renderer_version is only recorded, for failed_preview_job.
+    file_instance = ProjectFile.objects.filter(pk=file_id).first()
+    if file_instance is None:
+        return  # deleted before the worker got to it
+    get_or_build_preview(file_instance)
@@ -0,0 +1,361 @@
+"""
+Per-user read watermarks for tasks, comments and files.
+
+A user has read every item of a kind in a project whose id is at or below
+their ReadMarker.last_read_id. Items the user created never count as unread.
+
+Project cards read ReadMarker.unread_count instead of counting live: it is
+recomputed in the same statement that moves a watermark, incremented for
+every other member when an item is added, decremented for the members who
+hadn't read an item when it is deleted, and seeded when someone joins. The
+receivers in projects.signals do the adding, deleting and seeding, so only
+writes that send no signals (bulk_create, update, raw SQL) need
+rebuild_unread_counts(), which recomputes everything from the watermarks.
+
+Markers for reads made before they existed come from the legacy read_by
+tables through backfill_from_read_by(), run by `manage.py
+backfill_read_markers` rather than a migration.
+"""
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, FilteredRelation, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AccessRequest, Comment, Project, ProjectFile, ProjectMembership, ReadMarker, Task
+
+# kind -> (model, field holding the item's author)
+TRACKED_KINDS = {
+    ReadMarker.Kind.TASK: (Task, 'created_by'),
+    ReadMarker.Kind.COMMENT: (Comment, 'author'),
+    ReadMarker.Kind.FILE: (ProjectFile, 'uploaded_by'),
+}
+
+# Receipt writes put off until the current request has finished.
+_deferred = Local()
+
+
+def _watermark(user, kind, project):
+    """The user's last_read_id for a kind, 0 if they never read anything."""
+    marker = ReadMarker.objects.filter(user=user, project=project, kind=kind).values('last_read_id')[:1]
+    return Coalesce(Subquery(marker), 0)
+
+
+def unread_queryset(user, project, kind):
+    """Items of a kind above the user's watermark that someone else created."""
+    model, author_field = TRACKED_KINDS[kind]
+    return (
+        model.objects
+        .filter(project=project, id__gt=_watermark(user, kind, project.id))
+        .exclude(**{author_field: user})
+    )
+
+
+def unread_count(user, project, kind):
+    """One indexed range count over (project, id)."""
+    return unread_queryset(user, project, kind).count()
+
+
+def kind_for(item):
+    for kind, (model, _) in TRACKED_KINDS.items():
+        if isinstance(item, model):
+            return kind
+    raise TypeError(f'{type(item).__name__} is not read-tracked')
+
+
+def _author_column(kind):
+    model, author_field = TRACKED_KINDS[kind]
+    return model._meta.get_field(author_field).column
+
+
+def _unread_count_sql(kind, watermark_sql, user_sql):
+    """SQL counting a kind's items above a watermark that someone other than the user created."""
+    item_table = connection.ops.quote_name(TRACKED_KINDS[kind][0]._meta.db_table)
+    return (
+        f'(SELECT COUNT(*) FROM {item_table} WHERE project_id = %s '
+        f'AND id > {watermark_sql} AND {_author_column(kind)} <> {user_sql})'
+    )
+
+
+def with_unread_counts(projects, user):
+    """
+    Annotates a Project queryset with unread_tasks_count, unread_comments_count
+    and unread_files_count for the project card badges, read from the cached
+    counters: one LEFT JOIN per kind on the (user, project, kind) unique index.
+    """
+    annotations = {}
+    for kind in TRACKED_KINDS:
+        alias = f'{kind.value}_marker'
+        annotations[alias] = FilteredRelation(
+            'read_markers', condition=Q(read_markers__user=user, read_markers__kind=kind),
+        )
+        annotations[f'unread_{kind.value}s_count'] = Coalesce(F(f'{alias}__unread_count'), 0)
+    return projects.annotate(**annotations)
+
+
+def _upsert_sql(rows_sql):
+    """
+    Wraps a VALUES list or SELECT producing marker rows in an UPSERT that only
+    ever moves a watermark forward. The syntax is shared by SQLite and Postgres.
+    """
+    table = connection.ops.quote_name(ReadMarker._meta.db_table)
+    return (
+        f'INSERT INTO {table} (user_id, project_id, kind, last_read_id, last_read_at, unread_count) {rows_sql} '
+        f'ON CONFLICT (user_id, project_id, kind) DO UPDATE SET '
+        f'last_read_id = excluded.last_read_id, last_read_at = excluded.last_read_at, '
+        f'unread_count = excluded.unread_count '
+        f'WHERE {table}.last_read_id < excluded.last_read_id'
+    )
+
+
+def advance_read_markers(user, project, positions):
+    """
+    Moves the user's watermarks forward, and recounts what is left unread,
+    with a single UPSERT. `positions` maps a ReadMarker.Kind to the newest
+    item id the user has seen.
+    """
+    if not positions:
+        return
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    values, params = [], []
+    for kind, last_read_id in positions.items():
+        values.append(f'(%s, %s, %s, %s, %s, {_unread_count_sql(kind, "%s", "%s")})')
+        params += [user.pk, project.pk, str(kind), last_read_id, now, project.pk, last_read_id, user.pk]
+
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql('VALUES ' + ', '.join(values)), params)
+
+
+def record_seen(user, project, kind, item_ids, response=None):
+    """
+    Records that the user was shown the items with `item_ids` (e.g. one page of a list).
+
+    A watermark marks everything at or below it read, so it only moves over
+    the run of unread items, oldest first, that were all among those shown:
+    a newest-first, title-sorted, filtered or later page that skips an older
+    unread item leaves the watermark where it is.
+
+    Costs one SELECT and at most one write per call, and no write at all when
+    nothing shown extends that run, so polling a list that hasn't changed
+    never takes the database write lock. With READ_RECEIPTS_DEFERRED enabled
+    and a response given, the write runs after the response has been sent to
+    the client, from run_deferred_writes().
+    """
+    shown = set(item_ids)
+    if not shown or not user.is_authenticated:
+        return
+
+    # One past the page, so a run covering the whole page still ends in a miss.
+    oldest_unread = unread_queryset(user, project, kind).order_by('id').values_list('id', flat=True)[:len(shown) + 1]
+    newest_seen = None
+    for item_id in oldest_unread:
+        if item_id not in shown:
+            break
+        newest_seen = item_id
+    if newest_seen is None:
+        return
+
+    def write():
+        advance_read_markers(user, project, {kind: newest_seen})
+
+    if response is not None and getattr(settings, 'READ_RECEIPTS_DEFERRED', False):
+        if not hasattr(_deferred, 'writes'):
+            _deferred.writes = []
+        _deferred.writes.append(write)
+    else:
+        write()
+
+
+def run_deferred_writes():
+    """
+    Runs the receipt writes record_seen() put off during the current request.
+    Connected to request_finished, which Django sends once the server has
+    closed the response, after the body went out.
+    """
+    writes, _deferred.writes = getattr(_deferred, 'writes', []), []
+    for write in writes:
+        write()
+
+
+def mark_project_read(user, project):
+    """
+    Marks every task, comment and file in the project as read with one
+    INSERT ... SELECT UPSERT, however many items the project holds.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    selects, params = [], []
+    for kind, (model, _) in TRACKED_KINDS.items():
+        item_table = connection.ops.quote_name(model._meta.db_table)
+        selects.append(f'SELECT %s, %s, %s, COALESCE(MAX(id), 0), %s, 0 FROM {item_table} WHERE project_id = %s')
+        params += [user.pk, project.pk, str(kind), now, project.pk]
+
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(' UNION ALL '.join(selects)), params)
+
+
+def _read_by_maxima_sql(kind):
+    """SQL selecting (user_id, project_id, newest read item id) from a kind's legacy read_by table."""
+    model = TRACKED_KINDS[kind][0]
+    field = model._meta.get_field('read_by')
+    through_table = connection.ops.quote_name(field.remote_field.through._meta.db_table)
+    item_table = connection.ops.quote_name(model._meta.db_table)
+    return (
+        f'SELECT receipts.{field.m2m_reverse_name()} AS user_id, items.project_id AS project_id, '
+        f'MAX(items.id) AS last_read_id '
+        f'FROM {through_table} receipts JOIN {item_table} items ON items.id = receipts.{field.m2m_column_name()} '
+        f'GROUP BY receipts.{field.m2m_reverse_name()}, items.project_id'
+    )
+
+
+def backfill_from_read_by():
+    """
+    Moves each watermark up to the newest item its user has a legacy
+    read_by receipt for, with one INSERT ... SELECT UPSERT per kind, then
+    recounts the unread counters. Watermarks only move forward, so this
+    can be re-run at any time.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        for kind in TRACKED_KINDS:
+            rows_sql = (
+                f'SELECT user_id, project_id, %s, last_read_id, %s, 0 '
+                f'FROM ({_read_by_maxima_sql(kind)}) receipts WHERE 1 = 1'
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(_upsert_sql(rows_sql), [str(kind), now])
+        rebuild_unread_counts()
+
+
+def markers_behind_read_by():
+    """{kind: number of (user, project) watermarks below that user's newest read_by receipt}."""
+    table = connection.ops.quote_name(ReadMarker._meta.db_table)
+    behind = {}
+    for kind in TRACKED_KINDS:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM ({_read_by_maxima_sql(kind)}) receipts '
+                f'LEFT JOIN {table} markers ON markers.user_id = receipts.user_id '
+                f'AND markers.project_id = receipts.project_id AND markers.kind = %s '
+                f'WHERE markers.last_read_id IS NULL OR markers.last_read_id < receipts.last_read_id',
+                [str(kind)],
+            )
+            behind[kind] = cursor.fetchone()[0]
+    return behind
+
+
+def _member_ids_sql():
+    project_table = connection.ops.quote_name(Project._meta.db_table)
+    membership_table = connection.ops.quote_name(ProjectMembership._meta.db_table)
+    return (
+        f'SELECT owner_id AS user_id FROM {project_table} WHERE id = %s '
+        f'UNION SELECT user_id FROM {membership_table} WHERE project_id = %s'
+    )
+
+
+def item_added(item):
+    """Counts a new task, comment or file as unread for every member but its author, in one UPSERT."""
+    kind = kind_for(item)
+    table = connection.ops.quote_name(ReadMarker._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    author_id = getattr(item, f'{TRACKED_KINDS[kind][1]}_id')
+    # Members get their markers when they join (seed_unread_counts), so a
+    # missing row only happens for the owner of a project nobody else has
+    # posted in yet, and 1 is then the right count.
+    sql = (
+        f'INSERT INTO {table} (user_id, project_id, kind, last_read_id, last_read_at, unread_count) '
+        f'SELECT members.user_id, %s, %s, 0, %s, 1 FROM ({_member_ids_sql()}) members '
+        f'WHERE members.user_id <> %s '
+        f'ON CONFLICT (user_id, project_id, kind) DO UPDATE SET unread_count = {table}.unread_count + 1'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [item.project_id, str(kind), now, item.project_id, item.project_id, author_id])
+
+
+def item_removed(item):
+    """Uncounts a deleted item for the members who had not read it yet."""
+    kind = kind_for(item)
+    author_id = getattr(item, f'{TRACKED_KINDS[kind][1]}_id')
+    (
+        ReadMarker.objects
+        .filter(project_id=item.project_id, kind=kind, last_read_id__lt=item.pk, unread_count__gt=0)
+        .exclude(user_id=author_id)
+        .update(unread_count=F('unread_count') - 1)
+    )
+
+
+def seed_unread_counts(user, project):
+    """
+    Creates a user's markers for a project they just joined, counting every
+    item others created as unread. Existing markers are left alone.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    selects, params = [], []
+    for kind in TRACKED_KINDS:
+        selects.append(f'SELECT %s, %s, %s, 0, %s, {_unread_count_sql(kind, "0", "%s")} WHERE 1 = 1')
+        params += [user.pk, project.pk, str(kind), now, project.pk, user.pk]
+
+    table = connection.ops.quote_name(ReadMarker._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} (user_id, project_id, kind, last_read_id, last_read_at, unread_count) '
+        + ' UNION ALL '.join(selects)
+        + ' ON CONFLICT (user_id, project_id, kind) DO NOTHING'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _pending_requests_subquery():
+    pending = (
+        AccessRequest.objects
+        .filter(project=OuterRef('pk'), status=AccessRequest.Status.PENDING)
+        .order_by()
+        .values('project')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    return Coalesce(Subquery(pending), 0)
+
+
+def refresh_pending_requests(project_id):
+    """Recounts Project.pending_requests_count in one UPDATE."""
+    Project.objects.filter(pk=project_id).update(pending_requests_count=_pending_requests_subquery())
+
+
+def rebuild_unread_counts():
+    """
+    Recomputes every cached counter from the watermarks and the access
+    requests, creating the missing markers of owners and members first.
+    A handful of set-based statements, whatever the size of the tables.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    table = connection.ops.quote_name(ReadMarker._meta.db_table)
+    project_table = connection.ops.quote_name(Project._meta.db_table)
+    membership_table = connection.ops.quote_name(ProjectMembership._meta.db_table)
+
+    with transaction.atomic():
+        for kind in TRACKED_KINDS:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, project_id, kind, last_read_id, last_read_at, unread_count) '
+                    f'SELECT members.user_id, members.project_id, %s, 0, %s, 0 FROM ('
+                    f'SELECT owner_id AS user_id, id AS project_id FROM {project_table} '
+                    f'UNION SELECT user_id, project_id FROM {membership_table}'
+                    f') members WHERE 1 = 1 '
+                    f'ON CONFLICT (user_id, project_id, kind) DO NOTHING',
+                    [str(kind), now],
+                )
+
+            model, author_field = TRACKED_KINDS[kind]
+            unread = (
+                model.objects
+                .filter(project=OuterRef('project'), id__gt=OuterRef('last_read_id'))
+                .exclude(**{f'{author_field}_id': OuterRef('user_id')})
+                .order_by()
+                .values('project')
+                .annotate(n=Count('id'))
+                .values('n')
+            )
+            ReadMarker.objects.filter(kind=kind).update(unread_count=Coalesce(Subquery(unread), 0))
+
+        Project.objects.update(pending_requests_count=_pending_requests_subquery())
@@ -0,0 +1,124 @@
+from django.db.models import CharField, Value
+
+from .models import Ban, ProjectMembership
+
+
+class ProjectRoles:
+    """
+    A snapshot of who is who in a single project: the owner, every
+    membership and every ban, loaded with one UNION query.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.owner_id = project.owner_id
+        self.memberships = {}  # user_id -> (membership_id, role)
+        self.bans = {}         # user_id -> (ban_id, role at ban time)
+
+        members = ProjectMembership.objects.filter(project_id=project.id).values_list(
+            'id', 'user_id', 'role', Value('member', output_field=CharField())
+        )
+        bans = Ban.objects.filter(project_id=project.id).values_list(
+            'id', 'user_id', 'role', Value('ban', output_field=CharField())
+        )
+        for pk, user_id, role, kind in members.union(bans, all=True):
+            if kind == 'member':
+                self.memberships[user_id] = (pk, role)
+            else:
+                self.bans[user_id] = (pk, role)
+
+    @staticmethod
+    def _user_id(user):
+        """Accepts a User instance or a plain user id."""
+        if user is None:
+            return None
+        if isinstance(user, int):
+            return user
+        if not user.is_authenticated:
+            return None
+        return user.pk
+
+    def role_for(self, user):
+        """Returns 'owner', the membership role, or None for outsiders."""
+        user_id = self._user_id(user)
+        if user_id is None:
+            return None
+        if user_id == self.owner_id:
+            return 'owner'
+        membership = self.memberships.get(user_id)
+        return membership[1] if membership else None
+
+    def is_banned(self, user):
+        return self._user_id(user) in self.bans
+
+    def membership_for(self, user):
+        """
+        Returns an unsaved-looking ProjectMembership built from the snapshot,
+        good enough for templates that only need its id and role.
+        """
+        user_id = self._user_id(user)
+        membership = self.memberships.get(user_id)
+        if membership is None:
+            return None
+        pk, role = membership
+        return ProjectMembership(id=pk, project_id=self.project.id, user_id=user_id, role=role)
+
+
+def get_project_roles(request, project):
+    """
+    Returns the ProjectRoles for a project, memoized on the request so a
+    view, its helpers and its templates share a single query.
+    Without a request the snapshot is memoized on the project instance.
+    """
+    holder = request if request is not None else project
+    cache = getattr(holder, '_project_roles', None)
+    if cache is None:
+        cache = {}
+        holder._project_roles = cache
+
+    roles = cache.get(project.id)
+    if roles is None:
+        roles = ProjectRoles(project)
+        cache[project.id] = roles
+    return roles
+
+
+def get_user_role(request, project, user=None):
+    """Role of `user` (defaults to the requesting user) on the project."""
+    if user is None:
+        user = request.user
+    return get_project_roles(request, project).role_for(user)
+
+
+def _comment_permissions(viewer_role, commenter_role):
+    """(can_be_deleted, can_be_reported, can_be_moderated) on someone else's comment."""
+    can_delete = viewer_role == 'owner' or (viewer_role == 'admin' and commenter_role not in ['owner', 'admin'])
+    can_report = viewer_role in ['editor', 'viewer'] or (viewer_role == 'admin' and commenter_role in ['owner', 'admin'])
+    can_moderate = commenter_role != 'owner' and (
+        viewer_role == 'owner' or (viewer_role == 'admin' and commenter_role in ['editor', 'viewer'])
+    )
+    return can_delete, can_report, can_moderate
+
+
+def annotate_comment_permissions(comments, roles, viewer):
+    """
+    Sets can_be_deleted, can_be_reported and can_be_moderated (plus the
+    author's `membership` for moderation menus) on each comment, from one
+    ProjectRoles snapshot. The rules depend only on the two roles involved,
+    so they are worked out once per distinct author role rather than per
+    comment.
+    """
+    viewer_id = roles._user_id(viewer)
+    viewer_role = roles.role_for(viewer_id)
+    by_author_role = {}
+    for comment in comments:
+        if comment.author_id == viewer_id:
+            comment.can_be_deleted, comment.can_be_reported, comment.can_be_moderated = True, False, False
+            continue
+        commenter_role = roles.role_for(comment.author_id)
+        if commenter_role not in by_author_role:
+            by_author_role[commenter_role] = _comment_permissions(viewer_role, commenter_role)
+        comment.can_be_deleted, comment.can_be_reported, comment.can_be_moderated = by_author_role[commenter_role]
+        if comment.can_be_moderated:
+            comment.membership = roles.membership_for(comment.author_id)
+    return comments
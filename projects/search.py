@@ -0,0 +1,98 @@
+"""
+Ranked project search for the index page.
+
+SQLite matches against the projects_project_fts FTS5 table (kept in sync
+by projects.signals) and ranks with BM25; Postgres matches a GIN-indexed
+tsvector expression and ranks with ts_rank. Every word of the query must
+match, the last one as a prefix, so results follow the user as they type.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import ProjectMembership
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', title), 'A') "
+    "|| setweight(to_tsvector('simple', COALESCE(description, '')), 'B')"
+)
+# Title hits count more than description hits.
+SQLITE_BM25_WEIGHTS = '5.0, 1.0'
+
+
+def _words(query):
+    return re.findall(r'\w+', query or '')
+
+
+def _match_expression(words):
+    """(SQL filtering ids of matching projects, SQL ranking a matching project) for the current backend."""
+    table = connection.ops.quote_name('projects_project')
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{word}"' for word in words) + '*'
+        ids = ('SELECT rowid FROM projects_project_fts WHERE projects_project_fts MATCH %s', [match])
+        rank = (
+            f'SELECT -bm25(projects_project_fts, {SQLITE_BM25_WEIGHTS}) FROM projects_project_fts '
+            f'WHERE projects_project_fts MATCH %s AND projects_project_fts.rowid = {table}.id',
+            [match],
+        )
+        return ids, rank
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(words) + ':*'
+        ids = (f"SELECT id FROM projects_project WHERE ({POSTGRES_DOCUMENT}) @@ to_tsquery('simple', %s)", [tsquery])
+        rank = (f"ts_rank({POSTGRES_DOCUMENT}, to_tsquery('simple', %s))", [tsquery])
+        return ids, rank
+    return None
+
+
+def search_projects(projects, user, query):
+    """
+    Narrows a Project queryset to the projects matching `query` that `user`
+    may see (public, owned or joined), best match first. The queryset is
+    left unsliced so callers can narrow and page it further in SQL. Results
+    carry `search_rank`.
+    """
+    words = _words(query)
+    if not words:
+        return projects.none()
+
+    if user.is_authenticated:
+        joined = ProjectMembership.objects.filter(user=user).values('project')
+        visible = Q(is_public=True) | Q(owner=user) | Q(id__in=joined)
+    else:
+        visible = Q(is_public=True)
+    projects = projects.filter(visible)
+
+    expressions = _match_expression(words)
+    if expressions is None:
+        # Other databases: unranked substring match on the whole query.
+        text = Q(title__icontains=query) | Q(description__icontains=query)
+        return projects.filter(text).order_by('-created_at')
+
+    (ids_sql, ids_params), (rank_sql, rank_params) = expressions
+    return (
+        projects
+        .filter(id__in=RawSQL(ids_sql, ids_params))
+        .annotate(search_rank=RawSQL(rank_sql, rank_params, output_field=FloatField()))
+        .order_by('-search_rank', '-id')
+    )
+
+
+def index_project(project):
+    """Writes a project's title and description to the FTS5 table. Postgres needs no upkeep."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT OR REPLACE INTO projects_project_fts(rowid, title, description) VALUES (%s, %s, %s)',
+            [project.pk, project.title, project.description or ''],
+        )
+
+
+def unindex_project(project_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM projects_project_fts WHERE rowid = %s', [project_id])
+
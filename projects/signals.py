@@ -0,0 +1,172 @@
+from django.core.signals import request_finished
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import FriendRequest
+from . import activity, dashboard_cache, partial_cache, read_tracking, search
+from .models import (
+    AccessRequest, ActivityEvent, Ban, Comment, Project, ProjectFile, ProjectInvitation, ProjectLog,
+    ProjectMembership, Report, Task, TaskAssignment,
+)
+
+
+@receiver(post_save, sender=ProjectMembership)
+def seed_member_unread_counts(sender, instance, created, **kwargs):
+    """A new member starts with everything already in the project unread."""
+    if created:
+        read_tracking.seed_unread_counts(instance.user, instance.project)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=ProjectFile)
+def count_unread_item(sender, instance, created, **kwargs):
+    """Keeps ReadMarker.unread_count in step with new items, whichever code path created them."""
+    if created:
+        read_tracking.item_added(instance)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ProjectFile)
+def uncount_unread_item(sender, instance, **kwargs):
+    read_tracking.item_removed(instance)
+
+
+@receiver(post_save, sender=AccessRequest)
+@receiver(post_delete, sender=AccessRequest)
+def refresh_pending_requests(sender, instance, **kwargs):
+    """Keeps Project.pending_requests_count in step with the requests, whichever view changed them."""
+    read_tracking.refresh_pending_requests(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, **kwargs):
+    search.index_project(instance)
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance, **kwargs):
+    search.unindex_project(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=ProjectFile)
+def record_activity(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance)
+    elif activity.refresh(instance):
+        dashboard_cache.bump('activity', activity.reader_ids(instance.project_id))
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ProjectFile)
+def forget_activity(sender, instance, **kwargs):
+    # Queryset update() and delete() send no signals, so the feeds are bumped here.
+    if activity.forget(instance):
+        dashboard_cache.bump('activity', activity.reader_ids(instance.project_id))
+
+
+# Dashboard panel invalidation (see projects.dashboard_cache)
+
+@receiver(post_save, sender=FriendRequest)
+@receiver(post_delete, sender=FriendRequest)
+def bump_friend_panels(sender, instance, **kwargs):
+    """Friendships are only made and broken through requests, so this covers both panels."""
+    users = (instance.from_user_id, instance.to_user_id)
+    dashboard_cache.bump('friends', users)
+    dashboard_cache.bump('friend_requests', users)
+
+
+@receiver(post_save, sender=ProjectInvitation)
+@receiver(post_delete, sender=ProjectInvitation)
+def bump_invitations_panel(sender, instance, **kwargs):
+    dashboard_cache.bump('invitations', [instance.invitee_id])
+
+
+@receiver(post_save, sender=Project)
+def bump_project_panels(sender, instance, **kwargs):
+    """The project's title shows in its owner's list, its pending invitations and its members' feeds."""
+    dashboard_cache.bump('projects', [instance.owner_id])
+    dashboard_cache.bump('invitations', instance.invitations.filter(status='pending').values_list('invitee_id', flat=True))
+    dashboard_cache.bump('activity', activity.reader_ids(instance.pk))
+
+
+@receiver(post_delete, sender=Project)
+def bump_owner_panels(sender, instance, **kwargs):
+    # Members and invitees are bumped as their rows are deleted along with it.
+    dashboard_cache.bump('projects', [instance.owner_id])
+    dashboard_cache.bump('activity', [instance.owner_id])
+
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def bump_member_feed(sender, instance, **kwargs):
+    """Joining or leaving a project changes which events the member's feed shows."""
+    dashboard_cache.bump('activity', [instance.user_id])
+
+
+@receiver(post_save, sender=ActivityEvent)
+def bump_reader_feeds(sender, instance, created, **kwargs):
+    if created:
+        dashboard_cache.bump('activity', activity.reader_ids(instance.project_id))
+
+
+# Project partial invalidation (see projects.partial_cache)
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=ProjectFile)
+@receiver(post_delete, sender=ProjectFile)
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+@receiver(post_save, sender=Ban)
+@receiver(post_delete, sender=Ban)
+@receiver(post_save, sender=AccessRequest)
+@receiver(post_delete, sender=AccessRequest)
+@receiver(post_save, sender=ProjectLog)
+@receiver(post_delete, sender=ProjectLog)
+def bump_project_partials(sender, instance, **kwargs):
+    partial_cache.bump(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+def bump_own_partials(sender, instance, **kwargs):
+    partial_cache.bump(instance.pk)
+
+
+@receiver(post_save, sender=TaskAssignment)
+@receiver(post_delete, sender=TaskAssignment)
+def bump_assignment_partials(sender, instance, **kwargs):
+    # Bulk assignments (projects.assignments) skip signals and bump for themselves.
+    for project_id in Task.objects.filter(pk=instance.task_id).values_list('project_id', flat=True):
+        partial_cache.bump(project_id)
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def bump_report_partials(sender, instance, **kwargs):
+    for project_id in Comment.objects.filter(pk=instance.reported_comment_id).values_list('project_id', flat=True):
+        partial_cache.bump(project_id)
+
+
+@receiver(m2m_changed, sender=Task.pinned_by.through)
+def bump_pin_partials(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        partial_cache.bump(instance.project_id)
+        return
+    # Pinned from the user's side: pk_set holds task ids, or None when clearing them all.
+    tasks = Task.objects.filter(pinned_by=instance) if pk_set is None else Task.objects.filter(pk__in=pk_set)
+    for project_id in set(tasks.values_list('project_id', flat=True)):
+        partial_cache.bump(project_id)
+
+
+@receiver(request_finished)
+def write_deferred_read_receipts(sender, **kwargs):
+    read_tracking.run_deferred_writes()
@@ -1,7 +1,7 @@
 from django import template
 from django.utils.timesince import timesince
 from django.utils import timezone
-from projects.models import ProjectMembership
+from projects.roles import get_project_roles
 
 register = template.Library()
 
@@ -32,16 +32,17 @@ def has_project_role(user, project):
     """
     Checks the role of a given user on a specific project.
     Returns the role name (e.g., 'admin', 'editor') or None.
+    Filters can't see the request, so the role snapshot is memoized on the project.
     """
-    # Owner is a special case, not a membership object
-    if project.owner == user:
-        return 'owner'
-    
-    try:
-        membership = ProjectMembership.objects.get(project=project, user=user)
-        return membership.role
-    except ProjectMembership.DoesNotExist:
-        return None
+    return get_project_roles(None, project).role_for(user)
+
+@register.simple_tag(takes_context=True)
+def project_role(context, user, project):
+    """
+    Request-aware version of has_project_role that shares the view's role snapshot.
+    Usage: {% project_role comment.author project as author_role %}
+    """
+    return get_project_roles(context.get('request'), project).role_for(user)
     
 @register.filter
 def due_status(due_date):
@@ -1,3 +1,1007 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.files.base import ContentFile
+from django.urls import reverse
+
+from users.models import FriendRequest
+
+from . import activity, assignments, collaborator_graph, dashboard_cache, jobs, pagination, partial_cache, preview_cache, read_tracking, search
+from .csv_preview import build_csv_preview, lttb, minmax_bins
+from .models import AccessRequest, ActivityEvent, Ban, Comment, Job, Project, ProjectFile, ProjectMembership, ReadMarker, Task, TaskAssignment
+from .roles import get_project_roles
+from .views import PROJECTS_PER_PAGE, annotate_tasks_with_states, task_list
+
+
+class ProjectRolesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.admin = User.objects.create_user('admin', password='pw')
+        cls.viewer = User.objects.create_user('viewer', password='pw')
+        cls.banned = User.objects.create_user('banned', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.admin, role='admin')
+        ProjectMembership.objects.create(project=cls.project, user=cls.viewer, role='viewer')
+        Ban.objects.create(project=cls.project, user=cls.banned, banned_by=cls.owner, role='editor')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_roles_loaded_in_one_query(self):
+        with self.assertNumQueries(1):
+            roles = get_project_roles(None, self.project)
+            self.assertEqual(roles.role_for(self.owner), 'owner')
+            self.assertEqual(roles.role_for(self.admin), 'admin')
+            self.assertEqual(roles.role_for(self.viewer.id), 'viewer')
+            self.assertIsNone(roles.role_for(self.banned))
+            self.assertTrue(roles.is_banned(self.banned))
+            self.assertFalse(roles.is_banned(self.viewer))
+            self.assertEqual(roles.membership_for(self.admin).role, 'admin')
+
+    def test_comment_list_query_count_does_not_grow_with_authors(self):
+        self.client.login(username='owner', password='pw')
+        url = reverse('comment-list', args=[self.project.id])
+
+        Comment.objects.create(project=self.project, author=self.owner, body='first')
+        self.client.get(url)  # caches the comment total
+        partial_cache.bump(self.project.id)  # but not the rendered list
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+
+        for i in range(8):
+            author = User.objects.create_user(f'member{i}', password='pw')
+            ProjectMembership.objects.create(project=self.project, user=author, role='editor')
+            Comment.objects.create(project=self.project, author=author, body=f'comment {i}')
+
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'badge bg-warning', count=1)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        cls.comments = [Comment.objects.create(project=cls.project, author=cls.owner, body=f'c{i}') for i in range(25)]
+        # Ties on the sort key must be broken by id.
+        Comment.objects.filter(id__in=[c.id for c in cls.comments[8:14]]).update(created_at=cls.comments[8].created_at)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, ordering):
+        pages, cursor = [], ''
+        while True:
+            page = pagination.paginate(Comment.objects.filter(project=self.project), ordering, cursor, 10)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_and_backward_pages_cover_every_row_once(self):
+        for ordering in ('-created_at', 'created_at'):
+            pages = self.walk(ordering)
+            ids = [c.id for page in pages for c in page]
+            expected = list(Comment.objects.filter(project=self.project).order_by(ordering, ordering.replace('created_at', 'pk')).values_list('id', flat=True))
+            self.assertEqual(ids, expected)
+            self.assertEqual([page.number for page in pages], [1, 2, 3])
+
+            back = pagination.paginate(Comment.objects.all(), ordering, pages[2].previous_cursor, 10)
+            self.assertEqual([c.id for c in back], [c.id for c in pages[1]])
+            self.assertEqual((back.number, back.has_previous, back.has_next), (2, True, True))
+            self.assertEqual(back.previous_cursor, '')  # page 1 is the plain list URL
+
+    def test_bad_cursor_falls_back_to_the_first_page(self):
+        for cursor in ('garbage', pagination._encode('created_at', ['x', 1], 2, False)):
+            page = pagination.paginate(Comment.objects.all(), '-created_at', cursor, 10)
+            self.assertEqual(page.number, 1)
+
+    def test_deep_pages_use_no_offset_and_totals_are_cached(self):
+        self.client.login(username='owner', password='pw')
+        url = reverse('comment-list', args=[self.project.id])
+        first = self.client.get(url).context['comments_page']
+        self.assertEqual((first.count, first.num_pages), (25, 3))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'cursor': first.next_cursor})
+        sql = ' '.join(q['sql'] for q in queries).upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+
+class CommentPermissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.admin = User.objects.create_user('admin', password='pw')
+        cls.editor = User.objects.create_user('editor', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.admin, role='admin')
+        ProjectMembership.objects.create(project=cls.project, user=cls.editor, role='editor')
+        for i in range(30):
+            for author in (cls.owner, cls.admin, cls.editor):
+                Comment.objects.create(project=cls.project, author=author, body=f'{author.username} {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def flags(self, comment):
+        return comment.can_be_deleted, comment.can_be_reported, comment.can_be_moderated
+
+    def test_page_and_single_comment_menus_agree(self):
+        self.client.login(username='admin', password='pw')
+        page = self.client.get(reverse('comment-list', args=[self.project.id])).context['comments_page']
+        self.assertEqual(len(page), 10)
+        expected = {
+            self.owner.id: (False, True, False),
+            self.admin.id: (True, False, False),
+            self.editor.id: (True, False, True),
+        }
+        for comment in page:
+            self.assertEqual(self.flags(comment), expected[comment.author_id])
+            single = self.client.get(reverse('comment-main-menu', args=[comment.id])).context['comment']
+            self.assertEqual(self.flags(single), expected[comment.author_id])
+
+    def test_only_the_page_is_loaded(self):
+        self.client.login(username='owner', password='pw')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('comment-list', args=[self.project.id]))
+        comment_selects = [q['sql'] for q in queries if 'FROM "projects_comment"' in q['sql'] and 'COUNT' not in q['sql']]
+        self.assertEqual(len(comment_selects), 1)
+        self.assertIn('LIMIT 11', comment_selects[0])
+
+
+class BulkAssignmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        cls.members = [User.objects.create_user(f'member{i}', password='pw') for i in range(40)]
+        ProjectMembership.objects.bulk_create(
+            [ProjectMembership(project=cls.project, user=member, role='editor') for member in cls.members]
+        )
+        cls.task = Task.objects.create(project=cls.project, title='Review', created_by=cls.owner)
+
+    def test_assigning_to_everyone_is_constant_queries_and_counts_what_it_created(self):
+        # Someone else already assigned member0; that must neither fail nor count.
+        TaskAssignment.objects.create(task=self.task, assignee=self.members[0], assigner=self.members[1])
+        self.client.login(username='member1', password='pw')
+        url = reverse('mark-task-for-user', args=[self.task.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'assignee': 'all'})
+        self.assertLess(len(queries), 15)
+        self.assertEqual(json.loads(response['HX-Trigger'])['tasks-assigned'], {'created': 39})  # 40 others minus member0
+        self.assertEqual(TaskAssignment.objects.filter(task=self.task).count(), 40)
+        self.assertFalse(TaskAssignment.objects.filter(task=self.task, assignee=self.members[1]).exists())
+
+        self.assertEqual(assignments.assign_task_to_members(self.task, self.owner), 1)  # only member1 was left
+        self.assertEqual(assignments.assign_task(self.task, self.owner, [self.owner, self.members[2]]), 0)
+
+
+class ActivityFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The uploaded file goes to a throwaway MEDIA_ROOT, not the project's.
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=tmp.name))
+
+        cls.me = User.objects.create_user('me', password='pw')
+        cls.other = User.objects.create_user('other', password='pw')
+        cls.mine = Project.objects.create(title='Mine', owner=cls.me)
+        cls.joined = Project.objects.create(title='Joined', owner=cls.other)
+        cls.elsewhere = Project.objects.create(title='Elsewhere', owner=cls.other)
+        ProjectMembership.objects.create(project=cls.joined, user=cls.me, role='editor')
+        for i in range(8):
+            Task.objects.create(project=cls.mine, title=f'task {i}', created_by=cls.me)
+            Comment.objects.create(project=cls.joined, author=cls.other, body=f'comment {i}')
+            Comment.objects.create(project=cls.elsewhere, author=cls.other, body=f'hidden {i}')
+        cls.file = ProjectFile.objects.create(
+            project=cls.joined, uploaded_by=cls.other, file=ContentFile(b'x', name='notes.txt'),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_creating_items_appends_events(self):
+        event = ActivityEvent.objects.get(kind='file')
+        self.assertEqual((event.project, event.actor, event.object_id), (self.joined, self.other, self.file.id))
+        self.assertEqual(event.summary, self.file.file.name.removeprefix('project_files/'))
+        self.assertEqual(ActivityEvent.objects.filter(project=self.mine, kind='task').count(), 8)
+
+    def test_deleted_and_edited_items_leave_the_feed(self):
+        def summaries():
+            return [event.summary for event in activity.events_for(self.me)]
+
+        Comment.objects.get(body='comment 7').delete()
+        self.file.delete()
+        task = Task.objects.get(title='task 3')
+        task.title = 'task 3, renamed'
+        task.save()
+        self.assertNotIn('comment 7', summaries())
+        self.assertNotIn(self.file.file.name.removeprefix('project_files/'), summaries())
+        self.assertIn('task 3, renamed', summaries())
+        self.assertNotIn('task 3', summaries())
+
+    def test_dashboard_drops_a_deleted_comment_from_a_warm_feed(self):
+        self.client.login(username='me', password='pw')
+        url = reverse('dashboard', args=['me'])
+        self.assertContains(self.client.get(url), 'comment 7')
+        Comment.objects.get(body='comment 7').delete()
+        self.assertNotContains(self.client.get(url), 'comment 7')
+
+    def test_feed_pages_through_my_projects_with_one_query_each(self):
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = activity.feed_page(self.me, cursor)
+                seen += [(event.project.title, event.actor.username, event.summary) for event in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 17)
+        self.assertNotIn('Elsewhere', {title for title, _, _ in seen})
+        self.assertEqual(seen[0][:2], ('Joined', 'other'))  # the file, created last, comes first
+        self.assertEqual(seen[-1], ('Mine', 'me', 'task 0'))
+
+    def test_dashboard_shows_the_first_page_and_scrolls_for_more(self):
+        self.client.login(username='me', password='pw')
+        response = self.client.get(reverse('dashboard', args=['me']))
+        page = response.context['activity_page']
+        self.assertEqual(len(page), activity.FEED_PAGE_SIZE)
+        self.assertContains(response, 'hx-trigger="revealed"')
+
+        more = self.client.get(reverse('dashboard-activity'), {'cursor': page.next_cursor})
+        self.assertEqual(len(more.context['activity_page']), 17 - activity.FEED_PAGE_SIZE)
+        self.assertNotContains(more, 'hx-trigger="revealed"')
+
+
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create_user('me', password='pw')
+        cls.other = User.objects.create_user('other', password='pw')
+        cls.mine = Project.objects.create(title='Mine', owner=cls.me)
+        cls.joined = Project.objects.create(title='Joined', owner=cls.other)
+        ProjectMembership.objects.create(project=cls.joined, user=cls.me, role='editor')
+        Task.objects.create(project=cls.joined, title='first task', created_by=cls.other)
+        FriendRequest.objects.create(from_user=cls.other, to_user=cls.me, status='pending')
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='me', password='pw')
+        self.url = reverse('dashboard', args=['me'])
+
+    def test_warm_dashboard_renders_every_panel_from_cache(self):
+        self.assertContains(self.client.get(self.url), 'first task')
+        self.client.get(self.url)  # the first response set the CSRF cookie the invitations panel varies on
+        with CaptureQueriesContext(connection) as warm_queries:
+            warm = self.client.get(self.url)
+        self.assertContains(warm, 'first task')
+        # The session, the user, the page user and the profile linked from the page; none per panel.
+        self.assertLessEqual(len(warm_queries), 4)
+
+    def test_writes_invalidate_only_the_panels_they_feed(self):
+        self.client.get(self.url)
+        before = dashboard_cache.versions(self.me)
+
+        Task.objects.create(project=self.joined, title='second task', created_by=self.other)
+        after = dashboard_cache.versions(self.me)
+        self.assertEqual([p for p in dashboard_cache.PANELS if after[p] != before[p]], ['activity'])
+        self.assertContains(self.client.get(self.url), 'second task')
+
+        FriendRequest.objects.filter(to_user=self.me).get().delete()
+        FriendRequest.objects.create(from_user=self.other, to_user=self.me, status='accepted')
+        changed = dashboard_cache.versions(self.me)
+        self.assertEqual({p for p in dashboard_cache.PANELS if changed[p] != after[p]}, {'friends', 'friend_requests'})
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Incoming Friend Requests')
+        self.assertContains(response, reverse('remove-friend', args=[self.other.id]))
+
+    def test_renaming_a_project_refreshes_its_members_feeds(self):
+        self.client.get(self.url)
+        self.joined.title = 'Renamed'
+        self.joined.save()
+        self.assertContains(self.client.get(self.url), 'Renamed')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_leaves_panels_uncached(self):
+        self.assertEqual(dashboard_cache.fragment_seconds(), 0)
+        self.client.get(self.url)
+        # Another worker's bump would never reach this process's versions, so render afresh.
+        Project.objects.filter(pk=self.mine.pk).update(title='Renamed elsewhere')
+        self.assertContains(self.client.get(self.url), 'Renamed elsewhere')
+
+    def test_evicted_version_is_reseeded_past_old_fragments(self):
+        old = dashboard_cache.versions(self.me)['projects']
+        cache.delete(f'dashboard-version:projects:{self.me.pk}')
+        self.assertGreater(dashboard_cache.versions(self.me)['projects'], old)
+
+
+class ReadTrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.reader = User.objects.create_user('reader', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.reader, role='editor')
+        cls.tasks = [Task.objects.create(project=cls.project, title=f'task {i}', created_by=cls.owner) for i in range(5)]
+        Comment.objects.create(project=cls.project, author=cls.owner, body='hello')
+        Comment.objects.create(project=cls.project, author=cls.reader, body='my own')
+
+    def test_everything_is_unread_without_a_marker_except_own_items(self):
+        self.assertEqual(read_tracking.unread_count(self.reader, self.project, ReadMarker.Kind.TASK), 5)
+        self.assertEqual(read_tracking.unread_count(self.reader, self.project, ReadMarker.Kind.COMMENT), 1)
+        self.assertEqual(read_tracking.unread_count(self.owner, self.project, ReadMarker.Kind.TASK), 0)
+
+    def test_mark_read_view_query_count_does_not_grow_with_unread_items(self):
+        self.client.login(username='reader', password='pw')
+        url = reverse('mark-project-read', args=[self.project.id])
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.post(url)
+
+        Task.objects.bulk_create([Task(project=self.project, title=f'more {i}', created_by=self.owner) for i in range(200)])
+        Comment.objects.bulk_create([Comment(project=self.project, author=self.owner, body=f'more {i}') for i in range(200)])
+        with self.assertNumQueries(len(baseline)):
+            self.client.post(url)
+        for kind in ReadMarker.Kind:
+            self.assertEqual(read_tracking.unread_count(self.reader, self.project, kind), 0)
+
+    def test_mark_project_read_is_a_single_statement(self):
+        with self.assertNumQueries(1):
+            read_tracking.mark_project_read(self.reader, self.project)
+        for kind in ReadMarker.Kind:
+            self.assertEqual(read_tracking.unread_count(self.reader, self.project, kind), 0)
+
+        Task.objects.create(project=self.project, title='new', created_by=self.owner)
+        self.assertEqual(read_tracking.unread_count(self.reader, self.project, ReadMarker.Kind.TASK), 1)
+
+    def test_backfill_from_read_by_is_idempotent_and_verified(self):
+        self.tasks[2].read_by.add(self.reader)
+        self.tasks[0].read_by.add(self.reader)
+        with self.assertRaises(CommandError):
+            call_command('backfill_read_markers', '--verify', stdout=StringIO())
+
+        call_command('backfill_read_markers', stdout=StringIO())
+        call_command('backfill_read_markers', stdout=StringIO())
+        marker = ReadMarker.objects.get(user=self.reader, project=self.project, kind=ReadMarker.Kind.TASK)
+        self.assertEqual((marker.last_read_id, marker.unread_count), (self.tasks[2].id, 2))
+        call_command('backfill_read_markers', '--verify', stdout=StringIO())
+
+        # A watermark already past the receipts stays where it is.
+        read_tracking.advance_read_markers(self.reader, self.project, {ReadMarker.Kind.TASK: self.tasks[4].id})
+        read_tracking.backfill_from_read_by()
+        marker.refresh_from_db()
+        self.assertEqual(marker.last_read_id, self.tasks[4].id)
+
+    def test_markers_never_move_backwards(self):
+        kind = ReadMarker.Kind.TASK
+        read_tracking.advance_read_markers(self.reader, self.project, {kind: self.tasks[3].id})
+        read_tracking.advance_read_markers(self.reader, self.project, {kind: self.tasks[1].id})
+        marker = ReadMarker.objects.get(user=self.reader, project=self.project, kind=kind)
+        self.assertEqual(marker.last_read_id, self.tasks[3].id)
+        self.assertEqual(read_tracking.unread_count(self.reader, self.project, kind), 1)
+
+    def test_index_cards_show_unread_counts(self):
+        read_tracking.rebuild_unread_counts()  # the fixtures bypassed the add paths
+        self.client.login(username='reader', password='pw')
+        response = self.client.get(reverse('project-list'))
+        [project] = response.context['team_projects']
+        self.assertEqual(project.unread_tasks_count, 5)
+        self.assertEqual(project.unread_comments_count, 1)
+        self.assertEqual(project.unread_files_count, 0)
+
+
+class ProjectIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user('viewer', password='pw')
+
+    def add_projects(self, count):
+        for i in range(count):
+            owner = User.objects.create_user(f'owner{Project.objects.count()}', password='pw')
+            project = Project.objects.create(title=f'project {i}', owner=owner, is_public=True)
+            ProjectMembership.objects.create(project=project, user=self.viewer, role='viewer')
+            Project.objects.create(title=f'mine {i}', owner=self.viewer, is_public=True)
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.client.login(username='viewer', password='pw')
+        url = reverse('project-list')
+
+        self.add_projects(1)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+        baseline_count = len(baseline)
+
+        self.add_projects(8)
+        with self.assertNumQueries(baseline_count):
+            response = self.client.get(url)
+        # each project is listed in the public tab and in the team or owned tab
+        self.assertContains(response, 'badge bg-secondary">Team Project', count=18)
+        self.assertContains(response, 'badge bg-primary">My Project', count=18)
+
+    def test_tabs_are_paginated_independently(self):
+        self.add_projects(PROJECTS_PER_PAGE + 1)
+        self.client.login(username='viewer', password='pw')
+        response = self.client.get(reverse('project-list'), {'tab': 'team', 'team_page': 2})
+        self.assertEqual(len(response.context['team_projects']), 1)
+        self.assertEqual(len(response.context['owned_projects']), PROJECTS_PER_PAGE)
+        self.assertContains(response, '?tab=owned&owned_page=2')
+
+
+class ProjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.viewer = User.objects.create_user('viewer', password='pw')
+        cls.public = Project.objects.create(title='Quantum sensors', owner=cls.owner, is_public=True)
+        cls.joined = Project.objects.create(title='Lab notes', description='quantum dots', owner=cls.owner)
+        cls.hidden = Project.objects.create(title='Quantum secrets', owner=cls.owner)
+        cls.mine = Project.objects.create(title='Quantified self', owner=cls.viewer)
+        ProjectMembership.objects.create(project=cls.joined, user=cls.viewer, role='viewer')
+
+    def test_prefix_search_is_ranked_and_respects_visibility(self):
+        results = list(search.search_projects(Project.objects.all(), self.viewer, 'quant'))
+        self.assertEqual({p.id for p in results}, {self.public.id, self.joined.id, self.mine.id})
+        self.assertEqual(results[-1], self.joined)  # description hit ranks below title hits
+
+        anonymous = search.search_projects(Project.objects.all(), AnonymousUser(), 'quantum')
+        self.assertEqual(list(anonymous), [self.public])
+
+    def test_index_follows_save_and_delete(self):
+        self.public.title = 'Classical sensors'
+        self.public.save()
+        self.assertFalse(search.search_projects(Project.objects.all(), self.owner, 'quantum sens').exists())
+        self.assertTrue(search.search_projects(Project.objects.all(), self.owner, 'classic').exists())
+
+        self.hidden.delete()
+        self.assertEqual(search.search_projects(Project.objects.all(), self.owner, 'secrets').count(), 0)
+
+    def test_index_view_searches_each_tab_on_its_own(self):
+        self.client.login(username='viewer', password='pw')
+        url = reverse('project-list')
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as searched:
+            response = self.client.get(url, {'q': 'quant'})
+        self.assertEqual(len(searched), len(plain))  # a count and a page per tab either way
+        self.assertEqual([p.id for p in response.context['public_projects']], [self.public.id])
+        self.assertEqual([p.id for p in response.context['team_projects']], [self.joined.id])
+        self.assertEqual([p.id for p in response.context['owned_projects']], [self.mine.id])
+
+    def test_popular_public_matches_do_not_crowd_out_other_tabs(self):
+        for i in range(150):
+            Project.objects.create(title=f'Quantum sensors {i}', owner=self.owner, is_public=True)
+        self.client.login(username='viewer', password='pw')
+        response = self.client.get(reverse('project-list'), {'q': 'quant'})
+        self.assertEqual(response.context['public_projects'].paginator.count, 151)
+        self.assertEqual([p.id for p in response.context['team_projects']], [self.joined.id])
+        self.assertEqual([p.id for p in response.context['owned_projects']], [self.mine.id])
+
+
+class CollaboratorGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me, cls.ann, cls.bob, cls.cat, cls.dan, cls.eve = [
+            User.objects.create_user(name, password='pw') for name in ('me', 'ann', 'bob', 'cat', 'dan', 'eve')
+        ]
+        for a, b in [(cls.me, cls.ann), (cls.me, cls.bob), (cls.ann, cls.cat), (cls.bob, cls.cat), (cls.ann, cls.dan)]:
+            FriendRequest.objects.create(from_user=a, to_user=b, status='accepted')
+        # eve shares a project with me and is a friend of a friend.
+        shared = Project.objects.create(title='Shared', owner=cls.eve)
+        ProjectMembership.objects.create(project=shared, user=cls.me, role='viewer')
+        FriendRequest.objects.create(from_user=cls.bob, to_user=cls.eve, status='accepted')
+        cls.project = Project.objects.create(title='Mine', owner=cls.me)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(COLLABORATOR_GRAPH_PATH=str(Path(tmp.name) / 'graph.npz'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_suggestions_rank_by_mutual_connections(self):
+        expected = [(self.cat.id, 2, 0), (self.eve.id, 1, 1), (self.dan.id, 1, 0)]
+        with self.assertLogs('projects.collaborator_graph', 'WARNING'):
+            fallback = collaborator_graph.suggest_collaborators(self.me)  # no graph built yet
+        self.assertEqual([(s.user_id, s.mutual_friends, s.shared_projects) for s in fallback], expected)
+
+        collaborator_graph.rebuild()
+        suggestions = collaborator_graph.suggest_collaborators(self.me)
+        self.assertEqual([(s.user_id, s.mutual_friends, s.shared_projects) for s in suggestions], expected)
+        excluded = collaborator_graph.suggest_collaborators(self.me, exclude_ids={self.cat.id})
+        self.assertNotIn(self.cat.id, [s.user_id for s in excluded])
+
+    def test_manage_page_offers_suggestions_outside_the_team(self):
+        ProjectMembership.objects.create(project=self.project, user=self.dan, role='viewer')
+        self.client.login(username='me', password='pw')
+        url = reverse('manage-collaborators', args=[self.project.id])
+        with self.assertLogs('projects.collaborator_graph', 'WARNING'):
+            suggested = self.client.get(url).context['suggested_collaborators']  # no graph built yet
+        self.assertEqual([c['user'] for c in suggested], [self.cat, self.eve])
+
+        collaborator_graph.rebuild()
+        suggested = self.client.get(url).context['suggested_collaborators']
+        self.assertEqual([c['user'] for c in suggested], [self.cat, self.eve])
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.reader = User.objects.create_user('reader', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        Task.objects.create(project=cls.project, title='before joining', created_by=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.reader, role='editor')
+
+    def setUp(self):
+        cache.clear()
+
+    def cached_counts(self, user):
+        return {m.kind: m.unread_count for m in ReadMarker.objects.filter(user=user, project=self.project)}
+
+    def live_counts(self, user):
+        return {kind: read_tracking.unread_count(user, self.project, kind) for kind in ReadMarker.Kind}
+
+    def test_counters_follow_add_delete_and_read_paths(self):
+        self.assertEqual(self.cached_counts(self.reader), {'task': 1, 'comment': 0, 'file': 0})  # seeded on join
+
+        self.client.login(username='owner', password='pw')
+        self.client.post(reverse('add-task', args=[self.project.id]), {'title': 'new'})
+        self.client.post(reverse('add-comment', args=[self.project.id]), {'body': 'hi'})
+        self.assertEqual(self.cached_counts(self.reader), {'task': 2, 'comment': 1, 'file': 0})
+        self.assertEqual(self.cached_counts(self.reader), self.live_counts(self.reader))
+
+        self.client.post(reverse('delete-task', args=[Task.objects.get(title='new').id]))
+        self.assertEqual(self.cached_counts(self.reader)['task'], 1)
+
+        read_tracking.mark_project_read(self.reader, self.project)
+        self.assertEqual(self.cached_counts(self.reader), {'task': 0, 'comment': 0, 'file': 0})
+
+        self.client.post(reverse('add-task', args=[self.project.id]), {'title': 'after reading'})
+        self.client.logout()
+        self.client.login(username='reader', password='pw')
+        self.assertEqual(self.cached_counts(self.reader)['task'], 1)
+        self.client.get(reverse('task-list', args=[self.project.id]))
+        self.assertEqual(self.cached_counts(self.reader), self.live_counts(self.reader))
+
+    def test_counters_follow_writes_outside_the_views(self):
+        task = Task.objects.create(project=self.project, title='from the shell', created_by=self.owner)
+        Comment.objects.create(project=self.project, author=self.owner, body='from the admin')
+        self.assertEqual(self.cached_counts(self.reader), {'task': 2, 'comment': 1, 'file': 0})
+
+        Task.objects.filter(pk=task.pk).delete()
+        Comment.objects.all().delete()
+        self.assertEqual(self.cached_counts(self.reader), {'task': 1, 'comment': 0, 'file': 0})
+        self.assertEqual(self.cached_counts(self.reader), self.live_counts(self.reader))
+
+    def test_rebuild_matches_live_counts(self):
+        Comment.objects.create(project=self.project, author=self.owner, body='bypassing the views')
+        ReadMarker.objects.update(unread_count=42)
+        read_tracking.rebuild_unread_counts()
+        self.assertEqual(self.cached_counts(self.reader), self.live_counts(self.reader))
+        self.assertEqual(self.cached_counts(self.owner), {'task': 0, 'comment': 0, 'file': 0})
+
+    def test_pending_requests_counter_and_one_query_per_card_list(self):
+        requester = User.objects.create_user('requester', password='pw')
+        access_request = AccessRequest.objects.create(project=self.project, user=requester)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.pending_requests_count, 1)
+        access_request.delete()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.pending_requests_count, 0)
+
+        for i in range(5):
+            Project.objects.create(title=f'other {i}', owner=self.owner)
+        with self.assertNumQueries(1):
+            cards = list(read_tracking.with_unread_counts(Project.objects.filter(owner=self.owner), self.owner))
+        self.assertEqual(len(cards), 6)
+
+
+def count_writes(queries):
+    return sum(1 for q in queries if q['sql'].lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'))
+
+
+class TaskListReadReceiptTests(TestCase):
+    # SLA: a task_list GET issues at most one write, and none when nothing is new
+    MAX_WRITES_PER_VIEW = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.reader = User.objects.create_user('reader', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.reader, role='viewer')
+        for i in range(15):
+            Task.objects.create(project=cls.project, title=f'task {i}', created_by=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='reader', password='pw')
+        self.url = reverse('task-list', args=[self.project.id]) + '?sort=created_at'
+
+    def get_and_count_writes(self, url=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return count_writes(ctx.captured_queries)
+
+    def unread(self):
+        return read_tracking.unread_count(self.reader, self.project, ReadMarker.Kind.TASK)
+
+    def test_first_view_writes_once_and_refresh_writes_nothing(self):
+        self.assertLessEqual(self.get_and_count_writes(), self.MAX_WRITES_PER_VIEW)
+        self.assertEqual(self.get_and_count_writes(), 0)
+        # One page of 10, oldest first: the 5 newer tasks were never shown.
+        self.assertEqual(self.unread(), 5)
+
+        newest_first = reverse('task-list', args=[self.project.id])
+        self.assertEqual(self.get_and_count_writes(newest_first), 1)
+        self.assertEqual(self.unread(), 0)
+
+        Task.objects.create(project=self.project, title='fresh', created_by=self.owner)
+        self.assertEqual(self.get_and_count_writes(newest_first), 1)
+
+    def test_pages_skipping_older_unread_items_do_not_mark_them_read(self):
+        base = reverse('task-list', args=[self.project.id])
+        # Newest first shows tasks 6-15 while 1-5 are unread.
+        self.assertEqual(self.get_and_count_writes(base), 0)
+        self.assertEqual(self.get_and_count_writes(base + '?search=task+1'), 0)
+        self.assertEqual(self.unread(), 15)
+
+        # By title the first page is task 0-4 and 10-14; only the run 0-4 has no gap.
+        self.get_and_count_writes(base + '?sort=title')
+        self.assertEqual(self.unread(), 10)
+
+    @override_settings(READ_RECEIPTS_DEFERRED=True)
+    def test_deferred_receipt_is_written_when_response_closes(self):
+        self.assertLessEqual(self.get_and_count_writes(), self.MAX_WRITES_PER_VIEW)
+        self.assertEqual(self.unread(), 5)
+
+    @override_settings(READ_RECEIPTS_DEFERRED=True)
+    def test_deferred_receipt_waits_for_the_request_to_finish(self):
+        request = RequestFactory().get(self.url)
+        request.user = self.reader
+        response = task_list(request, self.project.id)
+        self.assertEqual(self.unread(), 15)
+
+        response.close()
+        self.assertEqual(self.unread(), 5)
+
+
+def item_queries(queries):
+    """The task and comment queries among `queries`, less record_seen's unread lookup."""
+    return [
+        q['sql'] for q in queries
+        if ('"projects_task"' in q['sql'] or '"projects_comment"' in q['sql']) and '"projects_readmarker"' not in q['sql']
+    ]
+
+
+class ProjectPartialCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.editor = User.objects.create_user('editor', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.editor, role='editor')
+        cls.task = Task.objects.create(project=cls.project, title='first task', created_by=cls.owner)
+        Comment.objects.create(project=cls.project, author=cls.owner, body='first comment')
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='owner', password='pw')
+
+    def list_queries(self, url):
+        """The SQL of a GET of `url` that touches the task or comment tables."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return item_queries(queries)
+
+    def test_unchanged_lists_are_served_from_cache(self):
+        for name in ('task-list', 'comment-list', 'file-list', 'request-inbox', 'project-inbox-preview'):
+            url = reverse(name, args=[self.project.id])
+            with CaptureQueriesContext(connection) as cold:
+                self.client.get(url)
+            with CaptureQueriesContext(connection) as warm:
+                self.client.get(url)
+            with self.subTest(name):
+                # Only the session, user, project, role and read receipt lookups are left.
+                self.assertLess(len(warm), len(cold))
+                self.assertFalse(item_queries(warm))
+
+    def test_writes_to_the_project_invalidate_its_lists(self):
+        tasks_url = reverse('task-list', args=[self.project.id])
+        comments_url = reverse('comment-list', args=[self.project.id])
+        self.client.get(tasks_url)
+        self.client.get(comments_url)
+
+        Comment.objects.create(project=self.project, author=self.editor, body='second comment')
+        self.assertContains(self.client.get(comments_url), 'second comment')
+
+        self.client.get(tasks_url)
+        self.task.pinned_by.add(self.editor)
+        self.assertTrue(self.list_queries(tasks_url))
+        assignments.assign_task(self.task, self.owner, [self.editor])
+        self.assertTrue(self.list_queries(tasks_url))
+
+        other = Project.objects.create(title='Other', owner=self.owner)
+        Task.objects.create(project=other, title='elsewhere', created_by=self.owner)
+        self.assertFalse(self.list_queries(tasks_url))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_leaves_lists_uncached(self):
+        url = reverse('task-list', args=[self.project.id])
+        self.client.get(url)
+        # A write another worker bumped for would go unseen here, so build every time.
+        Task.objects.filter(pk=self.task.pk).update(title='renamed elsewhere')
+        self.assertContains(self.client.get(url), 'renamed elsewhere')
+
+    def test_entries_are_per_viewer_and_query(self):
+        url = reverse('comment-list', args=[self.project.id])
+        self.assertContains(self.client.get(url), reverse('edit-comment', args=[Comment.objects.get().id]))
+        self.client.login(username='editor', password='pw')
+        self.assertNotContains(self.client.get(url), reverse('edit-comment', args=[Comment.objects.get().id]))
+
+        tasks_url = reverse('task-list', args=[self.project.id])
+        self.client.get(tasks_url)
+        self.assertNotContains(self.client.get(tasks_url, {'search': 'nothing'}), 'first task')
+
+
+class TaskStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.editor = User.objects.create_user('editor', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.editor, role='editor')
+
+    def setUp(self):
+        cache.clear()
+
+    def make_tasks(self, count):
+        return [Task.objects.create(project=self.project, title=f'task {i}', created_by=self.owner) for i in range(count)]
+
+    def test_states_for_assigned_and_pinned_members(self):
+        marked, half_marked = self.make_tasks(2)
+        marked.pinned_by.add(self.owner)
+        TaskAssignment.objects.create(task=marked, assignee=self.editor, assigner=self.owner)
+        TaskAssignment.objects.create(task=half_marked, assignee=self.editor, assigner=self.owner)
+
+        with self.assertNumQueries(4):
+            annotate_tasks_with_states([marked, half_marked])
+        self.assertTrue(marked.all_members_marked)
+        self.assertFalse(half_marked.all_members_marked)
+        self.assertEqual(half_marked.assigned_user_ids, [self.editor.id])
+        self.assertEqual(marked.pinned_user_ids, {self.owner.id})
+
+    def test_task_list_query_count_does_not_grow_with_tasks(self):
+        self.client.login(username='editor', password='pw')
+        url = reverse('task-list', args=[self.project.id])
+
+        self.make_tasks(1)
+        self.client.get(url)  # first view writes the read receipt
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+        baseline_count = len(baseline)
+
+        self.make_tasks(9)
+        self.client.get(url)
+        with self.assertNumQueries(baseline_count):
+            self.client.get(url)
+
+
+class StartupImportTests(TestCase):
+    def test_views_do_not_import_pandas_or_plotly(self):
+        script = (
+            "import sys, django; django.setup(); import projects.views; "
+            "print(sorted(m for m in ('pandas', 'plotly') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'chimera_core.settings'},
+        )
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+class CsvPreviewTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'data.csv'
+        self.path.write_text('x,y,label\n' + ''.join(f'{i},{i * 2},row{i}\n' for i in range(20000)))
+
+    def test_table_comes_from_head_and_chart_from_a_bounded_sample(self):
+        preview = build_csv_preview(self.path, 'Data', HEAD_ROWS=3, SAMPLE_POINTS=500)
+        self.assertEqual(preview.data_html.count('<tr'), 4)  # header + 3 rows
+        self.assertEqual(preview.rows_scanned, 20000)
+        self.assertEqual(preview.points_kept, 500)
+        self.assertFalse(preview.truncated)
+        self.assertIn('plotly', preview.chart_html)
+
+    def test_large_series_is_downsampled_before_plotting(self):
+        preview = build_csv_preview(self.path, 'Data', CHART_POINTS=300)
+        self.assertEqual(preview.points_kept, 300)
+        self.assertEqual(preview.downsample_method, 'lttb')
+        self.assertEqual(len(preview.chart_data['x_values']), 300)
+
+    def test_downsamplers_keep_extremes(self):
+        import numpy as np
+
+        x = np.arange(10000, dtype=float)
+        y = np.zeros(10000)
+        y[4321] = 50.0
+        kept = lttb(x, y, 100)
+        self.assertEqual(len(kept), 100)
+        self.assertEqual((kept[0], kept[-1]), (0, 9999))
+        self.assertIn(4321, kept)
+
+        rng = np.random.default_rng(0)
+        x, y = rng.random(10000), rng.random(10000)
+        kept = minmax_bins(x, y, 100)
+        self.assertLessEqual(len(kept), 100)
+        self.assertIn(y.argmax(), kept)
+        self.assertIn(y.argmin(), kept)
+
+    def test_exhausted_time_budget_truncates_gracefully(self):
+        preview = build_csv_preview(self.path, 'Data', TIME_BUDGET_SECONDS=0, MEMORY_BUDGET_MB=0.05)
+        self.assertTrue(preview.truncated)
+        self.assertLess(preview.rows_scanned, 20000)
+        self.assertIsNotNone(preview.chart_html)
+
+
+class PreviewCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pw')
+        cls.project = Project.objects.create(title='Chimera', owner=cls.owner)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        settings_override = override_settings(
+            MEDIA_ROOT=str(self.tmp / 'media'), CSV_PREVIEW_CACHE_DIR=str(self.tmp / 'cache'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_file(self, rows=100):
+        content = 'x,y\n' + ''.join(f'{i},{i * i}\n' for i in range(rows))
+        return ProjectFile.objects.create(
+            project=self.project, uploaded_by=self.owner,
+            file=ContentFile(content.encode(), name='data.csv'),
+        )
+
+    def test_second_view_is_served_from_cache(self):
+        file_instance = self.make_file()
+        first = preview_cache.get_or_build_preview(file_instance)
+        self.assertEqual(len(file_instance.content_hash), 64)  # legacy row hashed on first view
+
+        os.remove(file_instance.file.path)  # a rebuild would now fail
+        second = preview_cache.get_or_build_preview(file_instance)
+        self.assertEqual(second, first)
+        self.assertEqual(second.schema, [['x', 'int64'], ['y', 'int64']])
+
+    def test_invalidate_drops_entries_and_evict_keeps_newest(self):
+        old, new = self.make_file(rows=100), self.make_file(rows=200)
+        preview_cache.get_or_build_preview(old)
+        preview_cache.get_or_build_preview(new)
+        entries = sorted((self.tmp / 'cache').iterdir(), key=lambda p: p.name.startswith(new.content_hash))
+        os.utime(entries[0], (0, 0))
+
+        preview_cache.evict(entries[1].stat().st_size)
+        self.assertEqual([p.name for p in (self.tmp / 'cache').iterdir()], [entries[1].name])
+
+        preview_cache.invalidate(new.content_hash)
+        self.assertEqual(list((self.tmp / 'cache').iterdir()), [])
+
+    @override_settings(JOBS_WORKER=True)
+    def test_viewer_polls_until_the_worker_has_built_the_preview(self):
+        file_instance = self.make_file()
+        self.client.login(username='owner', password='pw')
+        url = reverse('file-preview', args=[file_instance.id])
+
+        response = self.client.get(url)
+        self.assertContains(response, 'hx-trigger="every 2s"')
+        self.client.get(url)
+        self.assertEqual(Job.objects.filter(status=Job.Status.QUEUED).count(), 1)  # not queued twice
+
+        self.assertEqual(jobs.run_pending(), 1)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'hx-trigger')
+        self.assertContains(response, 'Interactive Chart')
+
+
+    def test_without_a_worker_the_first_view_builds_the_preview(self):
+        file_instance = self.make_file()
+        self.client.login(username='owner', password='pw')
+        response = self.client.get(reverse('file-preview', args=[file_instance.id]))
+        self.assertNotContains(response, 'hx-trigger')
+        self.assertContains(response, 'Interactive Chart')
+        self.assertEqual(Job.objects.get().status, Job.Status.DONE)
+
+    @override_settings(JOBS_WORKER=True)
+    def test_malformed_csv_shows_its_error_without_retries(self):
+        file_instance = ProjectFile.objects.create(
+            project=self.project, uploaded_by=self.owner,
+            file=ContentFile(b'x,y\n\xff\xfe,1\n', name='broken.csv'),
+        )
+        self.client.login(username='owner', password='pw')
+        url = reverse('file-preview', args=[file_instance.id])
+        self.client.get(url)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(Job.objects.get().attempts, 1)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'hx-trigger')
+        self.assertContains(response, 'Could not process file:')
+
+    @override_settings(JOBS_WORKER=True)
+    def test_failed_preview_is_retried_after_a_renderer_upgrade(self):
+        file_instance = self.make_file()
+        job = preview_cache.request_preview(file_instance)
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.FAILED, attempts=3, payload={'file_id': file_instance.pk})
+        self.client.login(username='owner', password='pw')
+
+        response = self.client.get(reverse('file-preview', args=[file_instance.id]))
+        self.assertContains(response, 'hx-trigger="every 2s"')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 0))
+        self.assertEqual(Job.objects.count(), 1)
+
+def flaky_job(fail_times):
+    if Job.objects.filter(status=Job.Status.RUNNING, attempts__lt=fail_times).exists():
+        raise RuntimeError('boom')
+
+
+@override_settings(JOBS_RETRY_BACKOFF_SECONDS=0, JOBS_WORKER=True)
+class JobQueueTests(TestCase):
+    def test_failed_job_is_retried_then_succeeds(self):
+        job = jobs.enqueue(flaky_job, fail_times=2)
+        self.assertEqual(job.func, 'projects.tests.flaky_job')
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), (Job.Status.DONE, 3, ''))
+
+    def test_job_fails_for_good_after_max_attempts(self):
+        job = jobs.enqueue(flaky_job, max_attempts=2, fail_times=5)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+    @override_settings(JOBS_WORKER=False)
+    def test_without_a_worker_enqueue_runs_the_job_with_its_retries(self):
+        job = jobs.enqueue(flaky_job, fail_times=2)
+        self.assertEqual((job.status, job.attempts), (Job.Status.DONE, 3))
+
+    def test_enqueue_requeues_a_failed_job_with_the_same_key(self):
+        job = jobs.enqueue(flaky_job, key='k', max_attempts=1, fail_times=5)
+        jobs.run_pending()
+        again = jobs.enqueue(flaky_job, key='k', fail_times=0)
+        self.assertEqual((again.pk, again.status, again.attempts), (job.pk, Job.Status.QUEUED, 0))
+        jobs.run_pending()
+        again.refresh_from_db()
+        self.assertEqual(again.status, Job.Status.DONE)
+
+    def test_a_job_is_claimed_by_one_worker_only(self):
+        jobs.enqueue(flaky_job, fail_times=0)
+        self.assertIsNotNone(jobs.claim_next('worker-a'))
+        self.assertIsNone(jobs.claim_next('worker-b'))
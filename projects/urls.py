@@ -21,6 +21,7 @@ urlpatterns = [
     path('<int:project_id>/remove-collaborator/<int:user_id>/', views.remove_collaborator, name='remove-collaborator'),
     path('<int:project_id>/add-file/', views.add_file, name='add-file'),
     path('files/<int:file_id>/view/', views.view_file, name='view-file'),
+    path('files/<int:file_id>/preview/', views.file_preview, name='file-preview'),
     path('<int:project_id>/request-access/', views.request_access, name='request-access'),
     path('requests/<int:request_id>/cancel/', views.cancel_access_request, name='cancel-request'),
     path('requests/<int:request_id>/approve/', views.approve_request, name='approve-request'),
@@ -44,6 +45,7 @@ urlpatterns = [
     path('assignments/<int:assignment_id>/dismiss/', views.dismiss_assignment, name='dismiss-assignment'),
     path('dashboard/pinned-tasks/', views.dashboard_pinned_tasks, name='dashboard-pinned-tasks'),
     path('dashboard/assignments/', views.dashboard_assignments, name='dashboard-assignments'),
+    path('dashboard/activity/', views.dashboard_activity, name='dashboard-activity'),
     path('memberships/<int:membership_id>/ban/', views.ban_user, name='ban-user'),
     path('memberships/<int:membership_id>/remove/', views.remove_membership, name='remove-membership'),
     path('<int:project_id>/leave/', views.leave_project, name='leave-project'),
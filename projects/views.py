@@ -1,63 +1,73 @@
-import pandas as pd
-import plotly.express as px
-
+from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.http import HttpResponse
 from django.urls import reverse
+from django.utils.http import urlencode
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden, JsonResponse
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
 from django.core.paginator import Paginator
 from django.template.loader import render_to_string
 from django.utils import timezone
-from itertools import chain
+from django.utils.functional import SimpleLazyObject
+import json
+from collections import defaultdict
 from operator import attrgetter
 
-from .models import Project, Task, Comment, User, ProjectMembership, AccessRequest, TaskAssignment, PersonalTodo, Ban, Report, ProjectLog, ProjectInvitation, PersonalTodo
+from .models import Project, Task, Comment, User, ProjectMembership, AccessRequest, TaskAssignment, PersonalTodo, Ban, Report, ProjectLog, ProjectInvitation, PersonalTodo, ReadMarker, Job
 from .forms import ProjectForm, TaskForm, CommentForm, ProjectFileForm, ProjectFile, PersonalTodoForm
+from . import read_tracking
+from . import activity, assignments, collaborator_graph, dashboard_cache, pagination, partial_cache, preview_cache, search
+from .roles import annotate_comment_permissions, get_project_roles, get_user_role
 from users.models import FriendRequest
+from users.friendships import friend_ids, friends_of
 
-def annotate_task_with_states(task, project):
+def annotate_tasks_with_states(tasks):
     """
-    Calculates the marking/pinning state for a task and attaches it
-    to the task object for use in templates.
+    Calculates the marking/pinning state for a batch of tasks and attaches it
+    to each task object for use in templates. Runs a constant number of queries
+    however many tasks (or projects) the batch spans.
     """
-    # Get IDs of all members in the project
-    project_member_ids = {member.id for member in project.members}
-
-    # Get IDs of all users who have been assigned this task
-    assigned_user_ids = {assignment.assignee_id for assignment in task.assignments.all()}
-    
-    # Get IDs of all users who have pinned this task
-    pinned_user_ids = {user.id for user in task.pinned_by.all()}
-
-    # Combine the sets to find all "marked" users
-    all_marked_ids = assigned_user_ids.union(pinned_user_ids)
-
-    # Attach the final boolean flag to the task object
-    task.all_members_marked = project_member_ids.issubset(all_marked_ids)
-
-    # Also attach assigned user IDs, which we still need for other button states
-    task.assigned_user_ids = list(assigned_user_ids)
-    
-    return task
+    tasks = list(tasks)
+    if not tasks:
+        return tasks
+
+    task_ids = [task.id for task in tasks]
+    project_ids = {task.project_id for task in tasks}
+
+    # Get IDs of all members (owner + collaborators) of every project involved
+    member_ids = defaultdict(set)
+    for project_id, owner_id in Project.objects.filter(id__in=project_ids).values_list('id', 'owner_id'):
+        member_ids[project_id].add(owner_id)
+    for project_id, user_id in ProjectMembership.objects.filter(project_id__in=project_ids).values_list('project_id', 'user_id'):
+        member_ids[project_id].add(user_id)
+
+    # Get IDs of all users who have been assigned or have pinned each task
+    assigned_user_ids = defaultdict(set)
+    for task_id, user_id in TaskAssignment.objects.filter(task_id__in=task_ids).values_list('task_id', 'assignee_id'):
+        assigned_user_ids[task_id].add(user_id)
+    pinned_user_ids = defaultdict(set)
+    for task_id, user_id in Task.pinned_by.through.objects.filter(task_id__in=task_ids).values_list('task_id', 'user_id'):
+        pinned_user_ids[task_id].add(user_id)
+
+    for task in tasks:
+        # A member counts as "marked" if they were assigned the task or pinned it
+        all_marked_ids = assigned_user_ids[task.id] | pinned_user_ids[task.id]
+        task.all_members_marked = member_ids[task.project_id].issubset(all_marked_ids)
+        task.assigned_user_ids = list(assigned_user_ids[task.id])
+        task.pinned_user_ids = pinned_user_ids[task.id]
+
+    return tasks
 
-def get_user_role(project, user):
-    if not user.is_authenticated: return None
-    if project.owner == user: return 'owner'
-    try:
-        return ProjectMembership.objects.get(project=project, user=user).role
-    except ProjectMembership.DoesNotExist:
-        return None
-    
 def _get_manage_team_context(request, project):
-    requesting_user_role = get_user_role(project, request.user)
+    requesting_user_role = get_user_role(request, project)
     
-    friends_ids = {friend.id for friend in request.user.profile.get_friends()}
+    friends_ids = friend_ids(request.user)
     memberships = ProjectMembership.objects.filter(project=project).select_related('user')
     for m in memberships:
         m.is_friend = m.user.id in friends_ids
@@ -68,19 +78,16 @@ def _get_manage_team_context(request, project):
             m.permissible_roles = [r for r in ProjectMembership.ROLE_CHOICES if r[0] != 'admin']
 
     friends_to_display = []
+    suggested_to_display = []
     if requesting_user_role in ['owner', 'admin']:
-        all_friends = request.user.profile.get_friends()
-        current_member_ids = {m.user.id for m in project.projectmembership_set.all()}
-        current_member_ids.add(project.owner.id)
+        current_member_ids = {m.user_id for m in memberships}
+        current_member_ids.add(project.owner_id)
+        all_friends = friends_of(request.user).exclude(id__in=current_member_ids)
         
         # Get all pending invitations for this project
-        pending_invitations = {inv.invitee.id: inv for inv in project.invitations.filter(status='pending')}
+        pending_invitations = {inv.invitee_id: inv for inv in project.invitations.filter(status='pending')}
 
         for friend in all_friends:
-            # Don't show friends who are already in the project
-            if friend.id in current_member_ids:
-                continue
-            
             # Check if this friend has a pending invitation
             invitation = pending_invitations.get(friend.id)
             
@@ -89,6 +96,20 @@ def _get_manage_team_context(request, project):
                 'invitation': invitation
             })
 
+        # Friends of friends and co-members from other projects, best connected first.
+        banned_ids = set(project.bans.values_list('user_id', flat=True))
+        suggestions = collaborator_graph.suggest_collaborators(
+            request.user, current_member_ids | banned_ids, limit=settings.SUGGESTED_COLLABORATORS,
+        )
+        suggested_users = User.objects.in_bulk([s.user_id for s in suggestions])
+        for suggestion in suggestions:
+            if suggestion.user_id in suggested_users:
+                suggested_to_display.append({
+                    'user': suggested_users[suggestion.user_id],
+                    'suggestion': suggestion,
+                    'invitation': pending_invitations.get(suggestion.user_id),
+                })
+
     banned_list = Ban.objects.filter(project=project).select_related('user')
     for b in banned_list:
         b.can_unban = (requesting_user_role == 'owner' or (requesting_user_role == 'admin' and b.role != 'admin'))
@@ -97,6 +118,7 @@ def _get_manage_team_context(request, project):
         'project': project,
         'memberships': memberships,
         'friends_to_invite': friends_to_display,
+        'suggested_collaborators': suggested_to_display,
         'banned_list': banned_list,
         'role': requesting_user_role,
         'request': request,
@@ -108,80 +130,63 @@ def dashboard(request, username):
     if request.user != page_user:
         return redirect('project-list')
     
-    all_friends = page_user.profile.get_friends()
-    all_incoming_requests = FriendRequest.objects.filter(to_user=page_user, status='pending')
-    
-    friends_preview = all_friends[:5]
-    incoming_requests_preview = all_incoming_requests[:5]
-    
-    total_friends_count = len(all_friends)
-    total_incoming_requests_count = all_incoming_requests.count()
-    
     if page_user != request.user:
         return HttpResponseForbidden("You can only view your own dashboard.")
-    
-    owned_projects = Project.objects.filter(owner=request.user)
-    team_projects = Project.objects.filter(collaborators=page_user).exclude(owner=page_user)
-
-    # Get Tasks for the new dashboard sections
-    personal_todos = PersonalTodo.objects.filter(user=page_user)
-    pinned_tasks = Task.objects.filter(pinned_by=page_user)
-    assignments_for_me = TaskAssignment.objects.filter(assignee=page_user)
-
-    # Get Activity Feed
-    all_my_projects_ids = list(set(list(owned_projects.values_list('id', flat=True)) + list(team_projects.values_list('id', flat=True))))
-    recent_tasks = Task.objects.filter(project_id__in=all_my_projects_ids).order_by('-created_at')[:10]
-    recent_comments = Comment.objects.filter(project_id__in=all_my_projects_ids).order_by('-created_at')[:10]
-    recent_files = ProjectFile.objects.filter(project_id__in=all_my_projects_ids).order_by('-uploaded_at')[:10]
-
-    activity_list = sorted(
-        chain(recent_tasks, recent_comments, recent_files),
-        key=lambda instance: instance.created_at if hasattr(instance, 'created_at') else instance.uploaded_at,
-        reverse=True
-    )
-    
-    invitations = ProjectInvitation.objects.filter(invitee=request.user, status='pending')
 
+    # Every panel is cached per user (projects.dashboard_cache), so the
+    # context is lazy: querysets, and SimpleLazyObject for everything else,
+    # only hit the database when a panel misses the cache and renders.
+    incoming_requests = FriendRequest.objects.filter(to_user=page_user, status='pending')
     context = {
-        'owned_projects': owned_projects,
-        'team_projects': team_projects,
-        'personal_todos': personal_todos,
-        'pinned_tasks': pinned_tasks,
-        'assignments_for_me': assignments_for_me,
-        'activity_list': activity_list,
-        'friends': friends_preview,
-        'incoming_requests': incoming_requests_preview,
-        'total_friends_count': total_friends_count,
-        'total_incoming_requests_count': total_incoming_requests_count,
-        'invitations': invitations,
+        'panel_versions': dashboard_cache.versions(page_user),
+        'fragment_seconds': dashboard_cache.fragment_seconds(),
+        'friends': SimpleLazyObject(lambda: friends_of(page_user)[:5]),
+        'total_friends_count': SimpleLazyObject(lambda: len(friend_ids(page_user))),
+        'incoming_requests': incoming_requests.select_related('from_user')[:5],
+        'total_incoming_requests_count': SimpleLazyObject(incoming_requests.count),
+        'invitations': ProjectInvitation.objects.filter(invitee=page_user, status='pending').select_related('project', 'inviter'),
+        'owned_projects': Project.objects.filter(owner=page_user),
+        # First page of the activity feed; the rest loads as the user scrolls (dashboard_activity)
+        'activity_page': SimpleLazyObject(lambda: activity.feed_page(page_user)),
     }
     return render(request, 'projects/dashboard.html', context)
     
+PROJECTS_PER_PAGE = 20
+
+def paginate_tab(request, queryset, param):
+    """One page of a project tab; each tab keeps its own ?<tab>_page= parameter."""
+    return Paginator(queryset, PROJECTS_PER_PAGE).get_page(request.GET.get(param))
+
 def index(request):
     query = request.GET.get('q')
     active_tab = request.GET.get('tab', 'public')
 
-    public_projects = Project.objects.filter(is_public=True)
-    team_projects = Project.objects.none()
-    owned_projects = Project.objects.none()
+    # Every card renders from these columns: owner via select_related,
+    # membership via Exists(), badges from the cached counters.
+    listing = Project.objects.select_related('owner').order_by('-created_at', '-id')
     invitations = ProjectInvitation.objects.none()
-
     if request.user.is_authenticated:
-        team_projects = Project.objects.filter(collaborators=request.user)
-        owned_projects = Project.objects.filter(owner=request.user)
+        listing = listing.annotate(
+            is_member=Exists(ProjectMembership.objects.filter(project=OuterRef('pk'), user=request.user))
+        )
         # --- FIX: Fetch invitations for the logged-in user ---
-        invitations = ProjectInvitation.objects.filter(invitee=request.user, status='pending')
+        invitations = ProjectInvitation.objects.filter(invitee=request.user, status='pending').select_related('project', 'inviter')
 
     if query:
-        public_projects = public_projects.filter(Q(title__icontains=query) | Q(description__icontains=query))
-        team_projects = team_projects.filter(Q(title__icontains=query) | Q(description__icontains=query))
-        owned_projects = owned_projects.filter(Q(title__icontains=query) | Q(description__icontains=query))
+        # Ranked, and narrowed to what the user may see; each tab then pages its own scope in SQL.
+        listing = search.search_projects(listing, request.user, query)
+    public_projects = listing.filter(is_public=True)
+    team_projects = Project.objects.none()
+    owned_projects = Project.objects.none()
+    if request.user.is_authenticated:
+        team_projects = read_tracking.with_unread_counts(listing.filter(collaborators=request.user), request.user)
+        owned_projects = read_tracking.with_unread_counts(listing.filter(owner=request.user), request.user)
 
     context = {
-        'public_projects': public_projects,
-        'team_projects': team_projects,
-        'owned_projects': owned_projects,
-        'invitations': invitations, # Pass invitations to the template
+        'public_projects': paginate_tab(request, public_projects, 'public_page'),
+        'team_projects': paginate_tab(request, team_projects, 'team_page'),
+        'owned_projects': paginate_tab(request, owned_projects, 'owned_page'),
+        'invitations': list(invitations), # Pass invitations to the template
         'active_tab': active_tab,
         'query': query,
     }
@@ -191,10 +196,11 @@ def index(request):
 def project_detail(request, project_id):
     project = get_object_or_404(Project, pk=project_id)
     
-    if Ban.objects.filter(project=project, user=request.user).exists():
+    roles = get_project_roles(request, project)
+    if roles.is_banned(request.user):
         return render(request, 'projects/banned_page.html', {'project': project}, status=403)
     
-    role = get_user_role(project, request.user)
+    role = roles.role_for(request.user)
 
     # The authorization check is now simpler:
     if not project.is_public and role is None:
@@ -283,7 +289,7 @@ def logout_view(request):
 @login_required
 def add_task(request, project_id):
     project = Project.objects.get(pk=project_id)
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
     form = TaskForm(request.POST)
     
     if role not in ['owner', 'admin', 'editor']:
@@ -296,8 +302,8 @@ def add_task(request, project_id):
         task = form.save(commit=False)
         task.project = project
         task.created_by = request.user # ADD THIS LINE
-        task.save()
-        task.read_by.add(request.user)
+        with transaction.atomic():
+            task.save()
 
     response = HttpResponse(status=204)
     response['HX-Trigger'] = 'refresh-lists'
@@ -307,13 +313,14 @@ def add_task(request, project_id):
 def delete_task(request, task_id):
     task = Task.objects.get(pk=task_id)
     project = task.project
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role not in ['owner', 'admin', 'editor']:
         return HttpResponseForbidden()
 
     if request.method == 'POST':
-        task.delete()
+        with transaction.atomic():
+            task.delete()
         response = HttpResponse(status=204)
         response['HX-Redirect'] = reverse('project-detail', kwargs={'project_id': project.id})
         return response
@@ -325,7 +332,7 @@ def delete_task(request, task_id):
 def edit_task(request, task_id):
     task = Task.objects.get(pk=task_id)
     project = task.project
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role not in ['owner', 'admin', 'editor']:
         return HttpResponseForbidden()
@@ -348,7 +355,7 @@ def task_list(request, project_id):
     if not project.is_public and not request.user.is_authenticated:
         return HttpResponseForbidden()
     
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if not project.is_public and role is None:
         return HttpResponseForbidden()
@@ -362,39 +369,44 @@ def task_list(request, project_id):
     if sort_by not in valid_sorts:
         sort_by = '-created_at'
 
-    # Start with the sorted queryset
-    tasks_queryset = project.tasks.all().order_by(sort_by)
+    tasks_queryset = project.tasks.select_related('created_by')
 
     # Search Logic
     search_query = request.GET.get('search', '')
     if search_query:
         tasks_queryset = tasks_queryset.filter(title__icontains=search_query)
 
-    # Pagination Logic
-    paginator = Paginator(tasks_queryset, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    def build():
+        page_obj = pagination.paginate(
+            tasks_queryset, sort_by, request.GET.get('cursor'), 10,
+            count_key=f'tasks:{project.id}:{search_query}',
+        )
 
-    # Mark as read logic
-    if request.user.is_authenticated:
-        for task in page_obj:
-            task = annotate_task_with_states(task, project)
-            task.read_by.add(request.user)
+        if request.user.is_authenticated:
+            annotate_tasks_with_states(page_obj)
 
-    context = {
-        'project': project, 'tasks_page': page_obj, 'role': role,
-        'current_sort': sort_by, 'current_sort_name': valid_sorts.get(sort_by),
-        'valid_sorts': valid_sorts, 'search_query': search_query,
-    }
+        context = {
+            'project': project, 'tasks_page': page_obj, 'role': role,
+            'current_sort': sort_by, 'current_sort_name': valid_sorts.get(sort_by),
+            'valid_sorts': valid_sorts, 'search_query': search_query,
+            'page_params': urlencode({'sort': sort_by, 'search': search_query}),
+        }
+        # THE FIX: Always render the main component template
+        html = render_to_string('projects/partials/task_list.html', context, request)
+        return html, [task.pk for task in page_obj]
 
-    # THE FIX: Always render the main component template
-    return render(request, 'projects/partials/task_list.html', context)
+    html, shown_ids = partial_cache.get_or_build(request, project, role, 'tasks', build)
+    response = HttpResponse(html)
+
+    # Mark as read logic: at most one write per page view, none when nothing is new
+    read_tracking.record_seen(request.user, project, ReadMarker.Kind.TASK, shown_ids, response=response)
+    return response
 
 @login_required
 def toggle_task(request, task_id):
     task = Task.objects.get(pk=task_id)
     project = task.project
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role not in ['owner', 'admin', 'editor']:
         return HttpResponseForbidden("You do not have permission to modify tasks in this project.")
@@ -402,7 +414,7 @@ def toggle_task(request, task_id):
     task.is_completed = not task.is_completed
     task.save()
     
-    task = annotate_task_with_states(task, project)
+    annotate_tasks_with_states([task])
 
     context = {
         'task': task,
@@ -440,7 +452,7 @@ def get_mark_task_form(request, task_id):
 
 @login_required
 def confirm_mark_task(request, task_id):
-    task = get_object_or_404(Task, pk=task_id)
+    task = get_object_or_404(Task.objects.select_related('project'), pk=task_id)
     # The user we intend to mark the task for is passed as a GET parameter
     assignee_id = request.GET.get('assignee')
 
@@ -448,16 +460,14 @@ def confirm_mark_task(request, task_id):
     if not task.is_completed:
         assigner = request.user
         if assignee_id == 'all':
-            members = [task.project.owner] + list(task.project.collaborators.all())
-            for member in members:
-                TaskAssignment.objects.get_or_create(task=task, assignee=member, assigner=assigner)
+            created = assignments.assign_task_to_members(task, assigner)
         else:
             assignee = get_object_or_404(User, pk=assignee_id)
-            TaskAssignment.objects.get_or_create(task=task, assignee=assignee, assigner=assigner)
+            created = assignments.assign_task(task, assigner, [assignee])
 
         # Send a trigger to refresh the dashboard lists and return an empty response.
         response = HttpResponse(status=204)
-        response['HX-Trigger'] = 'refresh-dashboard'
+        response['HX-Trigger'] = json.dumps({'refresh-dashboard': None, 'tasks-assigned': {'created': created}})
         return response
 
     # Scenario 2: The task IS complete, so we return the HTML for the confirmation modal.
@@ -469,32 +479,21 @@ def confirm_mark_task(request, task_id):
 def mark_task_for_user(request, task_id):
     # This view now only handles the final POST action
     if request.method == 'POST':
-        task = get_object_or_404(Task, pk=task_id)
+        task = get_object_or_404(Task.objects.select_related('project'), pk=task_id)
         assigner = request.user
         assignee_id = request.POST.get('assignee')
 
         if assignee_id == 'all':
-            # --- START OF FIX ---
-
-            # 1. Pin the task for the current user.
+            # Pin the task for the current user and assign it to everyone else.
             task.pinned_by.add(request.user)
-
-            # 2. Get all members of the project.
-            members = [task.project.owner] + list(task.project.collaborators.all())
-
-            # 3. Create an assignment for everyone ELSE.
-            for member in members:
-                if member != request.user:
-                    TaskAssignment.objects.get_or_create(task=task, assignee=member, assigner=assigner)
-            
-            # --- END OF FIX ---
+            created = assignments.assign_task_to_members(task, assigner, exclude=[request.user])
         else:
             assignee = get_object_or_404(User, pk=assignee_id)
-            TaskAssignment.objects.get_or_create(task=task, assignee=assignee, assigner=assigner)
+            created = assignments.assign_task(task, assigner, [assignee])
 
         # After marking, trigger a refresh of the lists
         response = HttpResponse(status=204)
-        response['HX-Trigger'] = 'refresh-lists'
+        response['HX-Trigger'] = json.dumps({'refresh-lists': None, 'tasks-assigned': {'created': created}})
         return response
     return HttpResponseForbidden()
 
@@ -509,13 +508,13 @@ def unpin_task(request, task_id):
 def render_comment_list(request, project):
     """Helper function to render the entire comment list partial."""
     comments = project.comments.all()
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
     return render(request, 'projects/partials/comment_list.html', {'project': project, 'comments': comments, 'role': role})
 
 @login_required
 def add_comment(request, project_id):
     project = Project.objects.get(pk=project_id)
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
     
     if role not in ['owner', 'admin', 'editor']:
         return HttpResponseForbidden("You do not have permission to add tasks to this project.")
@@ -526,8 +525,8 @@ def add_comment(request, project_id):
             comment = form.save(commit=False)
             comment.project = project
             comment.author = request.user
-            comment.save()
-            comment.read_by.add(request.user)
+            with transaction.atomic():
+                comment.save()
 
     response = HttpResponse(status=204)
     response['HX-Trigger'] = 'refresh-lists'
@@ -536,7 +535,8 @@ def add_comment(request, project_id):
 @login_required
 def comment_list(request, project_id):
     project = get_object_or_404(Project, id=project_id)
-    viewer_role = get_user_role(project, request.user)
+    roles = get_project_roles(request, project)
+    viewer_role = roles.role_for(request.user)
 
     if viewer_role is None and not project.is_public:
         return HttpResponseForbidden("You cannot view comments for this project.")
@@ -551,42 +551,28 @@ def comment_list(request, project_id):
     if current_sort not in valid_sorts:
         current_sort = '-created_at'
 
-    # Apply the sorting to the queryset
-    comments = Comment.objects.filter(project=project).select_related('author').order_by(current_sort)
     # --- END FIX ---
 
-    # Set permissions for each comment
-    for comment in comments:
-        is_self = (request.user == comment.author)
-        commenter_role = get_user_role(project, comment.author)
-
-        # Deletion logic
-        can_delete = False
-        if is_self or viewer_role == 'owner' or (viewer_role == 'admin' and commenter_role not in ['owner', 'admin']):
-            can_delete = True
-        comment.can_be_deleted = can_delete
-        
-        # Reporting logic
-        can_report = False
-        if not is_self:
-            if viewer_role in ['editor', 'viewer'] or (viewer_role == 'admin' and commenter_role in ['owner', 'admin']):
-                can_report = True
-        comment.can_be_reported = can_report
-        
-    paginator = Paginator(comments, 10)
-    page_number = request.GET.get('page')
-    comments_page = paginator.get_page(page_number)
-
-    context = {
-        'project': project,
-        'comments_page': comments_page,
-        'role': viewer_role,
-        # Pass sorting context to the template
-        'valid_sorts': valid_sorts,
-        'current_sort': current_sort,
-        'current_sort_name': valid_sorts.get(current_sort)
-    }
-    return render(request, 'projects/partials/comment_list.html', context)
+    def build():
+        comments_page = pagination.paginate(
+            Comment.objects.filter(project=project).select_related('author'),
+            current_sort, request.GET.get('cursor'), 10, count_key=f'comments:{project.id}',
+        )
+        annotate_comment_permissions(comments_page, roles, request.user)
+
+        context = {
+            'project': project,
+            'comments_page': comments_page,
+            'role': viewer_role,
+            # Pass sorting context to the template
+            'valid_sorts': valid_sorts,
+            'current_sort': current_sort,
+            'current_sort_name': valid_sorts.get(current_sort),
+            'page_params': urlencode({'sort': current_sort}),
+        }
+        return render_to_string('projects/partials/comment_list.html', context, request)
+
+    return HttpResponse(partial_cache.get_or_build(request, project, viewer_role, 'comments', build))
 
 @login_required
 def edit_comment(request, comment_id):
@@ -602,7 +588,7 @@ def edit_comment(request, comment_id):
         if form.is_valid():
             form.save()
             # After saving, we return the single, updated comment item display.
-            role = get_user_role(project, request.user)
+            role = get_user_role(request, project)
             return render(request, 'projects/partials/comment_item.html', {'comment': comment, 'project': project, 'role': role})
 
     # If GET, return the form for editing.
@@ -616,8 +602,9 @@ def delete_comment(request, comment_id):
     """Deletes a comment after checking permissions."""
     comment = get_object_or_404(Comment, id=comment_id)
     project = comment.project
-    requesting_user_role = get_user_role(project, request.user)
-    comment_author_role = get_user_role(project, comment.author)
+    roles = get_project_roles(request, project)
+    requesting_user_role = roles.role_for(request.user)
+    comment_author_role = roles.role_for(comment.author_id)
 
     # This is the permission logic fix, matching the one above.
     can_delete = False
@@ -631,7 +618,8 @@ def delete_comment(request, comment_id):
     if not can_delete:
         return HttpResponseForbidden("You do not have permission to delete this comment.")
 
-    comment.delete()
+    with transaction.atomic():
+        comment.delete()
     
     # This HX-Trigger tells the frontend to refresh the comment list
     response = HttpResponse(status=200)
@@ -672,7 +660,7 @@ def get_manage_team_context(request, project):
     A single, authoritative function to get all context needed
     for the manage_collaborators page and its partials.
     """
-    current_user_role = get_user_role(project, request.user)
+    current_user_role = get_user_role(request, project)
     memberships = ProjectMembership.objects.filter(project=project)
     
     banned_list = Ban.objects.filter(project=project)
@@ -704,7 +692,7 @@ def get_manage_team_context(request, project):
 def ban_user(request, membership_id):
     membership = get_object_or_404(ProjectMembership, id=membership_id)
     project = membership.project
-    requesting_user_role = get_user_role(project, request.user)
+    requesting_user_role = get_user_role(request, project)
     
     if not (requesting_user_role == 'owner' or (requesting_user_role == 'admin' and membership.role != 'admin')):
         return HttpResponseForbidden("You do not have permission to ban this user.")
@@ -728,7 +716,7 @@ def ban_user(request, membership_id):
 def unban_user(request, ban_id):
     ban = get_object_or_404(Ban, id=ban_id)
     project = ban.project
-    requesting_user_role = get_user_role(project, request.user)
+    requesting_user_role = get_user_role(request, project)
 
     # --- FIX: Re-implement correct permission check using the stored role ---
     if not (requesting_user_role == 'owner' or (requesting_user_role == 'admin' and ban.role != 'admin')):
@@ -756,7 +744,7 @@ def get_unban_user_modal(request, ban_id):
 def add_collaborator(request, project_id, user_id):
     project = get_object_or_404(Project, id=project_id)
     user_to_add = get_object_or_404(User, id=user_id)
-    requesting_user_role = get_user_role(project, request.user)
+    requesting_user_role = get_user_role(request, project)
 
     if requesting_user_role not in ['owner', 'admin']:
         return HttpResponseForbidden("You do not have permission to add collaborators.")
@@ -773,7 +761,7 @@ def add_collaborator(request, project_id, user_id):
 def remove_membership(request, membership_id):
     membership = get_object_or_404(ProjectMembership, id=membership_id)
     project = membership.project
-    requesting_user_role = get_user_role(project, request.user)
+    requesting_user_role = get_user_role(request, project)
 
     if not (requesting_user_role == 'owner' or (requesting_user_role == 'admin' and membership.role != 'admin')):
         return HttpResponseForbidden("You do not have permission to remove this user.")
@@ -791,7 +779,7 @@ def remove_membership(request, membership_id):
 def change_role(request, membership_id):
     membership = get_object_or_404(ProjectMembership, id=membership_id)
     project = membership.project
-    requesting_user_role = get_user_role(project, request.user)
+    requesting_user_role = get_user_role(request, project)
     
     if not (requesting_user_role == 'owner' or (requesting_user_role == 'admin' and membership.role != 'admin')):
         return HttpResponseForbidden("...")
@@ -835,7 +823,7 @@ def cancel_access_request(request, request_id):
 @login_required
 def add_file(request, project_id):
     project = Project.objects.get(pk=project_id)
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role not in ['owner', 'admin', 'editor']:
         return JsonResponse({'error': 'Permission denied.'}, status=403)
@@ -843,17 +831,53 @@ def add_file(request, project_id):
     if request.method == 'POST':
         # Dropzone sends files in 'request.FILES'. We loop through them.
         for f in request.FILES.getlist('file'):
-            ProjectFile.objects.create(
-                project=project,
-                uploaded_by=request.user,
-                file=f,
-                description=f.name # Default description to the filename
-            )
+            with transaction.atomic():
+                project_file = ProjectFile.objects.create(
+                    project=project,
+                    uploaded_by=request.user,
+                    file=f,
+                    description=f.name, # Default description to the filename
+                    content_hash=preview_cache.file_content_hash(f),
+                )
+            if project_file.file.name.endswith('.csv') and settings.JOBS_WORKER:
+                preview_cache.request_preview(project_file) # Built by the job worker, not this request
         # Return a success JSON response for Dropzone
         return JsonResponse({'status': 'success'})
 
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+def get_file_preview_context(file_instance):
+    """
+    Context for the CSV preview partial. Previews are built by the job worker,
+    so a cache miss queues a job and the partial polls until it is done; with
+    no worker the job runs inline and its preview is shown at once.
+    """
+    context = {'file': file_instance, 'preview': None, 'preview_pending': False, 'error_message': None}
+    if not file_instance.file.name.endswith('.csv'):
+        return context
+
+    try:
+        preview = preview_cache.cached_preview(file_instance)
+    except Exception as e:
+        context['error_message'] = f"Could not process file: {e}"
+        return context
+
+    if preview is not None:
+        context['preview'] = preview
+        context['error_message'] = preview.error_message
+        return context
+
+    job = preview_cache.failed_preview_job(file_instance) or preview_cache.request_preview(file_instance)
+    if job.status == Job.Status.FAILED:
+        context['error_message'] = "Could not process file: the preview job failed."
+    elif job.status == Job.Status.DONE and (preview := preview_cache.cached_preview(file_instance)):
+        # Built inline, as no worker is running
+        context['preview'] = preview
+        context['error_message'] = preview.error_message
+    else:
+        context['preview_pending'] = True
+    return context
+
 @login_required
 def view_file(request, file_id):
     file_instance = ProjectFile.objects.get(pk=file_id)
@@ -862,53 +886,41 @@ def view_file(request, file_id):
     if project.owner != request.user and request.user not in project.collaborators.all():
         return HttpResponseForbidden("You do not have permission to view this file.")
 
-    chart_html = None
-    data_html = None 
-    error_message = None
+    context = get_file_preview_context(file_instance)
+    context['project'] = project
+    return render(request, 'projects/file_viewer.html', context)
 
-    try:
-        file_path = file_instance.file.path
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-            
-            data_html = df.head().to_html(classes='table table-striped table-bordered', index=False)
+@login_required
+def file_preview(request, file_id):
+    """HTMX endpoint polled by the file viewer while the preview job runs."""
+    file_instance = ProjectFile.objects.get(pk=file_id)
+    project = file_instance.project
 
-            if len(df.columns) >= 2:
-                fig = px.scatter(df, x=df.columns[0], y=df.columns[1], title=f"Data from {file_instance.file.name}")
-                chart_html = fig.to_html(full_html=False, include_plotlyjs='cdn')
-            else:
-                error_message = "Cannot generate a 2D chart: The CSV file has fewer than two columns."
+    if project.owner != request.user and request.user not in project.collaborators.all():
+        return HttpResponseForbidden("You do not have permission to view this file.")
 
-    except Exception as e:
-        error_message = f"Could not process file: {e}"
-        messages.error(request, error_message)
-
-    context = {
-        'file': file_instance,
-        'project': project,
-        'chart_html': chart_html,
-        'data_html': data_html,
-        'error_message': error_message
-    }
-    return render(request, 'projects/file_viewer.html', context)
+    context = get_file_preview_context(file_instance)
+    return render(request, 'projects/partials/file_preview.html', context)
 
 @login_required
 def file_list(request, project_id):
     project = Project.objects.get(pk=project_id)
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role is None and not project.is_public:
         return render(request, '403.html', {'project': project}, status=403)
 
-    files_queryset = project.files.all().order_by('-uploaded_at')
-    paginator = Paginator(files_queryset, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    def build():
+        page_obj = pagination.paginate(
+            project.files.select_related('uploaded_by'), '-uploaded_at', request.GET.get('cursor'), 20,
+        )
+        context = {'project': project, 'files_page': page_obj, 'role': role}
+        return render_to_string('projects/partials/file_list_content.html', context, request)
 
+    # Only the list is cached; the page around it carries the CSRF token and messages.
     context = {
         'project': project,
-        'files_page': page_obj,
-        'role': role,
+        'files_html': partial_cache.get_or_build(request, project, role, 'files', build),
     }
     return render(request, 'projects/file_list.html', context)
 
@@ -916,15 +928,17 @@ def file_list(request, project_id):
 def delete_file(request, file_id):
     file_instance = ProjectFile.objects.get(pk=file_id)
     project = file_instance.project
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     # Authorization check
     if not (file_instance.uploaded_by == request.user or role in ['owner', 'admin']):
         return HttpResponseForbidden()
 
     if request.method == 'POST':
+        preview_cache.invalidate(file_instance.content_hash) # Drop any cached CSV preview
         file_instance.file.delete() # Delete the actual file from storage
-        file_instance.delete()      # Delete the database record
+        with transaction.atomic():
+            file_instance.delete()  # Delete the database record
         response = HttpResponse(status=204)
         response['HX-Redirect'] = reverse('file-list', kwargs={'project_id': project.id})
         return response
@@ -938,7 +952,7 @@ def request_inbox(request, project_id):
     
     if not project.is_public and not request.user.is_authenticated:
         return HttpResponseForbidden() # Or an empty response
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     # This component is only for owners and admins
     if role not in ['owner', 'admin']:
@@ -955,22 +969,25 @@ def request_inbox(request, project_id):
     if sort_by not in valid_sorts:
         sort_by = '-requested_at'
 
-    # Get all PENDING requests and apply sorting
-    requests_queryset = AccessRequest.objects.filter(project=project, status='pending').order_by(sort_by)
+    def build():
+        # Get all PENDING requests and apply sorting
+        requests_queryset = AccessRequest.objects.filter(project=project, status='pending').order_by(sort_by)
 
-    # Pagination Logic (5 per page)
-    paginator = Paginator(requests_queryset, 5)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        # Pagination Logic (5 per page)
+        paginator = Paginator(requests_queryset, 5)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
 
-    context = {
-        'project': project,
-        'requests_page': page_obj,
-        'current_sort': sort_by,
-        'current_sort_name': valid_sorts.get(sort_by),
-        'valid_sorts': valid_sorts,
-    }
-    return render(request, 'projects/partials/request_inbox.html', context)
+        context = {
+            'project': project,
+            'requests_page': page_obj,
+            'current_sort': sort_by,
+            'current_sort_name': valid_sorts.get(sort_by),
+            'valid_sorts': valid_sorts,
+        }
+        return render_to_string('projects/partials/request_inbox.html', context, request)
+
+    return HttpResponse(partial_cache.get_or_build(request, project, role, 'requests', build))
 
 @login_required
 def request_access(request, project_id):
@@ -998,7 +1015,7 @@ def request_access(request, project_id):
 def approve_request(request, request_id):
     access_request = AccessRequest.objects.get(pk=request_id)
     project = access_request.project
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role not in ['owner', 'admin']:
         return HttpResponseForbidden()
@@ -1016,7 +1033,7 @@ def approve_request(request, request_id):
 def deny_request(request, request_id):
     access_request = AccessRequest.objects.get(pk=request_id)
     project = access_request.project
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role not in ['owner', 'admin']:
         return HttpResponseForbidden()
@@ -1031,19 +1048,11 @@ def deny_request(request, request_id):
 
 @login_required
 def mark_project_read(request, project_id):
-    project = Project.objects.get(pk=project_id)
-    if request.method == 'POST': 
-        tasks_to_mark = project.tasks.exclude(read_by=request.user)
-        for task in tasks_to_mark:
-            task.read_by.add(request.user)
-
-        comments_to_mark = project.comments.exclude(read_by=request.user)
-        for comment in comments_to_mark:
-            comment.read_by.add(request.user)
-            
-        files_to_mark = project.files.exclude(read_by=request.user)
-        for file in files_to_mark:
-            file.read_by.add(request.user)
+    project = get_object_or_404(Project, pk=project_id)
+    if request.method == 'POST':
+        # One set-based UPSERT covering tasks, comments and files, however many are unread
+        with transaction.atomic():
+            read_tracking.mark_project_read(request.user, project)
 
     response = HttpResponse(status=204)
     response['HX-Trigger'] = 'refresh-lists'
@@ -1075,9 +1084,15 @@ def dismiss_assignment(request, assignment_id):
 @login_required
 def dashboard_pinned_tasks(request):
     user = request.user
-    pinned_tasks = Task.objects.filter(pinned_by=user)
+    pinned_tasks = annotate_tasks_with_states(Task.objects.filter(pinned_by=user).select_related('project'))
     return render(request, 'projects/partials/dashboard_pinned_tasks.html', {'pinned_tasks': pinned_tasks, 'user': user})
 
+@login_required
+def dashboard_activity(request):
+    """The next page of the dashboard activity feed, for infinite scroll."""
+    activity_page = activity.feed_page(request.user, request.GET.get('cursor'))
+    return render(request, 'projects/partials/dashboard_activity.html', {'activity_page': activity_page})
+
 @login_required
 def dashboard_assignments(request):
     user = request.user
@@ -1151,7 +1166,7 @@ def report_comment(request, comment_id):
 @login_required
 def project_inbox(request, project_id):
     project = get_object_or_404(Project, pk=project_id)
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     # Any member of the project can view the inbox page.
     if role is None:
@@ -1172,22 +1187,25 @@ def project_inbox(request, project_id):
 @login_required
 def inbox_preview(request, project_id):
     project = get_object_or_404(Project, pk=project_id)
-    role = get_user_role(project, request.user)
+    role = get_user_role(request, project)
 
     if role is None:
         return HttpResponseForbidden()
 
-    # Fetch the 3 most recent reports and logs for the preview
-    reports = Report.objects.filter(reported_comment__project=project)[:3]
-    logs = ProjectLog.objects.filter(project=project)[:3]
+    def build():
+        # Fetch the 3 most recent reports and logs for the preview
+        reports = Report.objects.filter(reported_comment__project=project)[:3]
+        logs = ProjectLog.objects.filter(project=project)[:3]
 
-    context = {
-        'project': project,
-        'role': role,
-        'reports': reports,
-        'logs': logs,
-    }
-    return render(request, 'projects/partials/inbox_preview_modal.html', context)
+        context = {
+            'project': project,
+            'role': role,
+            'reports': reports,
+            'logs': logs,
+        }
+        return render_to_string('projects/partials/inbox_preview_modal.html', context, request)
+
+    return HttpResponse(partial_cache.get_or_build(request, project, role, 'inbox-preview', build))
 
 def prune_reports(project_id):
     """Keeps the number of reports for a project at or below 25."""
@@ -1211,7 +1229,7 @@ def prune_logs(project_id):
 def kick_user(request, membership_id):
     membership = get_object_or_404(ProjectMembership, pk=membership_id)
     project = membership.project
-    kicker_role = get_user_role(project, request.user)
+    kicker_role = get_user_role(request, project)
 
     # --- Permission Checks ---
     if kicker_role not in ['owner', 'admin']:
@@ -1237,7 +1255,7 @@ def kick_user(request, membership_id):
 def kick_and_ban_user(request, membership_id):
     membership = get_object_or_404(ProjectMembership, pk=membership_id)
     project = membership.project
-    kicker_role = get_user_role(project, request.user)
+    kicker_role = get_user_role(request, project)
 
     # --- Permission Checks ---
     if kicker_role not in ['owner', 'admin']:
@@ -1269,38 +1287,12 @@ def kick_and_ban_user(request, membership_id):
 def get_comment_context(request, comment_id):
     """
     A helper function to gather all context and permissions for a single comment.
+    Uses the same rules as comment_list, via annotate_comment_permissions.
     """
-    comment = get_object_or_404(Comment, id=comment_id)
-    viewer_role = get_user_role(comment.project, request.user)
-    is_self = (comment.author == request.user)
-    commenter_role = get_user_role(comment.project, comment.author)
-
-    # --- START: FIX for delete permissions ---
-    can_be_deleted = False
-    if is_self:
-        can_be_deleted = True
-    elif viewer_role == 'owner':
-        can_be_deleted = True
-    elif viewer_role == 'admin' and commenter_role not in ['owner', 'admin']:
-        can_be_deleted = True
-    comment.can_be_deleted = can_be_deleted
-    # --- END: FIX ---
-
-    # Reporting logic (remains the same)
-    comment.can_be_reported = False
-    if not is_self:
-        if viewer_role in ['editor', 'viewer']:
-            comment.can_be_reported = True
-        elif viewer_role == 'admin' and commenter_role in ['owner', 'admin']:
-            # This seems like an old rule, but I'll leave it. It means admins can report other admins/owners.
-            comment.can_be_reported = True
-
-    # Moderation logic (remains the same)
-    comment.can_be_moderated = False
-    if not is_self and commenter_role != 'owner':
-        if viewer_role == 'owner' or (viewer_role == 'admin' and commenter_role in ['editor', 'viewer']):
-            comment.can_be_moderated = True
-            comment.membership = ProjectMembership.objects.filter(project=comment.project, user=comment.author).first()
+    comment = get_object_or_404(Comment.objects.select_related('project', 'author'), id=comment_id)
+    roles = get_project_roles(request, comment.project)
+    viewer_role = roles.role_for(request.user)
+    annotate_comment_permissions([comment], roles, request.user)
 
     return {'comment': comment, 'project': comment.project, 'role': viewer_role, 'user': request.user}
 
@@ -1321,12 +1313,13 @@ def get_comment_moderation_menu(request, comment_id):
 def send_invitation(request, project_id, user_id):
     project = get_object_or_404(Project, id=project_id)
     invitee = get_object_or_404(User, id=user_id)
-    requesting_user_role = get_user_role(project, request.user)
+    roles = get_project_roles(request, project)
+    requesting_user_role = roles.role_for(request.user)
 
     if requesting_user_role not in ['owner', 'admin']:
         return HttpResponseForbidden("You do not have permission to invite users.")
 
-    if Ban.objects.filter(project=project, user=invitee).exists():
+    if roles.is_banned(invitee):
         response = render(request, 'projects/partials/_banned_user_modal.html')
         response['HX-Retarget'] = '#dialog'
         response['HX-Trigger'] = '{"showModal": "true"}'
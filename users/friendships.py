@@ -0,0 +1,74 @@
+"""
+Friendship lookups backed by the symmetric Friendship edge table.
+
+friend_ids(user) answers from the (user, friend) unique index alone and
+remembers the result on the user instance, so repeated calls within a
+request (request.user lives for exactly one request) cost one query.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from .models import FriendRequest, Friendship
+
+_CACHE_ATTR = '_friend_ids_cache'
+
+
+def friend_ids(user):
+    """The ids of `user`'s friends, as a frozenset."""
+    cached = getattr(user, _CACHE_ATTR, None)
+    if cached is None:
+        cached = frozenset(Friendship.objects.filter(user=user).values_list('friend_id', flat=True))
+        setattr(user, _CACHE_ATTR, cached)
+    return cached
+
+
+def friends_of(user):
+    """A User queryset of `user`'s friends, in username order."""
+    return User.objects.filter(id__in=friend_ids(user)).order_by('username')
+
+
+def are_friends(user, other):
+    return other.id in friend_ids(user)
+
+
+def _forget(*users):
+    for user in users:
+        if hasattr(user, _CACHE_ATTR):
+            delattr(user, _CACHE_ATTR)
+
+
+def add_friendship(user, other):
+    with transaction.atomic():
+        Friendship.objects.bulk_create(
+            [Friendship(user=user, friend=other), Friendship(user=other, friend=user)],
+            ignore_conflicts=True,
+        )
+    _forget(user, other)
+
+
+def remove_friendship(user, other):
+    Friendship.objects.filter(user__in=[user, other], friend__in=[user, other]).delete()
+    _forget(user, other)
+
+
+def friendship_statuses(user, other_ids):
+    """
+    Resolves how `user` relates to each of `other_ids` with one query.
+    Returns {id: (status, request)} where status is 'none', 'pending_sent',
+    'pending_received' or 'friends', and request is the pending request
+    `user` sent (so it can be cancelled), else None.
+    """
+    other_ids = list(other_ids)
+    statuses = {other_id: ('none', None) for other_id in other_ids}
+    requests = FriendRequest.objects.filter(
+        Q(from_user=user, to_user__in=other_ids) | Q(to_user=user, from_user__in=other_ids)
+    ).exclude(status='declined')
+    for request in requests:
+        sent = request.from_user_id == user.id
+        other_id = request.to_user_id if sent else request.from_user_id
+        if request.status == 'accepted':
+            statuses[other_id] = ('friends', None)
+        elif statuses[other_id][0] != 'friends':
+            statuses[other_id] = ('pending_sent', request) if sent else ('pending_received', None)
+    return statuses
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_friendships(apps, schema_editor):
+    """Creates both edges for every accepted FriendRequest."""
+    FriendRequest = apps.get_model('users', 'FriendRequest')
+    Friendship = apps.get_model('users', 'Friendship')
+    accepted = FriendRequest.objects.filter(status='accepted').values_list('from_user_id', 'to_user_id')
+    batch = []
+    for from_id, to_id in accepted.iterator(chunk_size=5000):
+        batch += [Friendship(user_id=from_id, friend_id=to_id), Friendship(user_id=to_id, friend_id=from_id)]
+        if len(batch) >= 5000:
+            Friendship.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Friendship.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_profile_research_interests_profile_skills'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friendships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'friend'), name='users_friendship_user_friend_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_friendships, migrations.RunPython.noop),
+    ]
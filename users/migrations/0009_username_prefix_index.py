@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Username type-ahead filters with username__istartswith. SQLite runs that
+# as a case-insensitive LIKE, which can only use a NOCASE index; Postgres
+# compares UPPER(username) with LIKE, which needs a pattern-ops index on
+# the same expression.
+FORWARD = {
+    'sqlite': ["CREATE INDEX users_username_prefix_idx ON auth_user (username COLLATE NOCASE)"],
+    'postgresql': ["CREATE INDEX users_username_prefix_idx ON auth_user (UPPER(username::text) text_pattern_ops)"],
+}
+REVERSE = {
+    'sqlite': ["DROP INDEX IF EXISTS users_username_prefix_idx"],
+    'postgresql': ["DROP INDEX IF EXISTS users_username_prefix_idx"],
+}
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0008_friendship'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(REVERSE)),
+    ]
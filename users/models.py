@@ -37,19 +37,9 @@ class Profile(models.Model):
         return f'{self.user.username} Profile'
 
     def get_friends(self):
-        """Helper method to get a list of this user's friends."""
-        friends = []
-        # Get accepted requests where this user was the sender
-        sent_requests = FriendRequest.objects.filter(from_user=self.user, status='accepted')
-        for request in sent_requests:
-            friends.append(request.to_user)
-            
-        # Get accepted requests where this user was the receiver
-        received_requests = FriendRequest.objects.filter(to_user=self.user, status='accepted')
-        for request in received_requests:
-            friends.append(request.from_user)
-            
-        return friends
+        """This user's friends, in username order."""
+        from .friendships import friends_of
+        return list(friends_of(self.user))
 
 
 class FriendRequest(models.Model):
@@ -73,3 +63,22 @@ class FriendRequest(models.Model):
 
     def __str__(self):
         return f"Friend request from {self.from_user.username} to {self.to_user.username}"
+
+
+class Friendship(models.Model):
+    """
+    One direction of an accepted friendship; every friendship is stored as
+    two rows, (a, b) and (b, a), so a user's friends are one index range on
+    (user, friend). Maintained from FriendRequest by users.signals.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='friendships')
+    friend = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'friend'], name='users_friendship_user_friend_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.friend_id}"
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from . import friendships
+from .models import FriendRequest, Profile
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -19,3 +20,16 @@ def save_user_profile(sender, instance, **kwargs):
     """
     instance.profile.save()
 
+
+@receiver(post_save, sender=FriendRequest)
+def sync_friendship(sender, instance, created, **kwargs):
+    """Keeps the Friendship edges in step with the request's status."""
+    if instance.status == 'accepted':
+        friendships.add_friendship(instance.from_user, instance.to_user)
+    elif not created:
+        friendships.remove_friendship(instance.from_user, instance.to_user)
+
+@receiver(post_delete, sender=FriendRequest)
+def drop_friendship(sender, instance, **kwargs):
+    if instance.status == 'accepted':
+        friendships.remove_friendship(instance.from_user, instance.to_user)
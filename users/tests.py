@@ -1,3 +1,115 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .friendships import friend_ids, friends_of, friendship_statuses
+from .models import FriendRequest, Friendship
+
+
+class FriendshipTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+        cls.carol = User.objects.create_user('carol', password='pw')
+
+    def befriend(self, from_user, to_user):
+        request = FriendRequest.objects.create(from_user=from_user, to_user=to_user)
+        request.status = 'accepted'
+        request.save()
+        return request
+
+    def test_accepting_a_request_creates_both_edges(self):
+        pending = FriendRequest.objects.create(from_user=self.alice, to_user=self.bob)
+        self.assertFalse(Friendship.objects.exists())
+
+        pending.status = 'accepted'
+        pending.save()
+        self.assertEqual(friend_ids(User.objects.get(pk=self.alice.pk)), {self.bob.id})
+        self.assertEqual(friend_ids(User.objects.get(pk=self.bob.pk)), {self.alice.id})
+
+    def test_removing_the_request_removes_the_friendship(self):
+        self.befriend(self.alice, self.bob)
+        self.befriend(self.carol, self.alice)
+
+        self.client.login(username='alice', password='pw')
+        self.client.get(reverse('remove-friend', args=[self.bob.id]))
+        alice = User.objects.get(pk=self.alice.pk)
+        self.assertEqual(list(friends_of(alice)), [self.carol])
+        self.assertEqual(friend_ids(User.objects.get(pk=self.bob.pk)), set())
+
+    def test_friend_ids_is_cached_on_the_user(self):
+        self.befriend(self.alice, self.bob)
+        alice = User.objects.get(pk=self.alice.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(friend_ids(alice), {self.bob.id})
+            self.assertEqual(friend_ids(alice), {self.bob.id})
+
+
+class FriendSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create_user('me', password='pw')
+        cls.users = [User.objects.create_user(f'anna{i:02d}', password='pw') for i in range(30)]
+        User.objects.create_user('hannah', password='pw')
+        FriendRequest.objects.create(from_user=cls.me, to_user=cls.users[0])
+        FriendRequest.objects.create(from_user=cls.users[1], to_user=cls.me)
+        FriendRequest.objects.create(from_user=cls.me, to_user=cls.users[2], status='accepted')
+        FriendRequest.objects.create(from_user=cls.users[3], to_user=cls.me, status='declined')
+
+    def test_statuses_are_resolved_in_one_query(self):
+        ids = [user.id for user in self.users[:5]]
+        with self.assertNumQueries(1):
+            statuses = friendship_statuses(self.me, ids)
+        self.assertEqual(
+            [statuses[user_id][0] for user_id in ids],
+            ['pending_sent', 'pending_received', 'friends', 'none', 'none'],
+        )
+        self.assertEqual(statuses[ids[0]][1].to_user_id, ids[0])
+
+    def test_search_is_a_paginated_username_prefix_match(self):
+        self.client.login(username='me', password='pw')
+        url = reverse('manage-friends')
+        response = self.client.get(url, {'q': 'ANNA', 'tab': 'search'})
+        page = response.context['search_results']
+        self.assertEqual(page.paginator.count, 30)
+        self.assertEqual(len(page), 20)
+        self.assertEqual(page[0]['status'], 'pending_sent')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'q': 'anna', 'tab': 'search', 'page': 2})
+        friend_request_queries = [q for q in queries if 'users_friendrequest' in q['sql']]
+        self.assertEqual(len(friend_request_queries), 3)  # incoming, sent and the page's statuses
+
+
+class PictureUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The uploads go to a throwaway MEDIA_ROOT, not the project's.
+        tmp = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(MEDIA_ROOT=tmp))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='pw')
+
+    def test_uploads_are_stored_without_decoding_the_image(self):
+        self.client.login(username='alice', password='pw')
+        payload = b'already cropped in the browser'
+        decoded = AssertionError('decoded in the request')
+        with mock.patch('PIL.Image.open', side_effect=decoded), \
+                mock.patch('django.core.files.images.get_image_dimensions', side_effect=decoded):
+            for name, field in (('upload-profile-picture', 'profile_picture'), ('upload-banner-picture', 'banner_picture')):
+                response = self.client.post(reverse(name), {'cropped_image': SimpleUploadedFile('me.png', payload)})
+                with self.subTest(name):
+                    self.assertEqual(response.json()['status'], 'success')
+                    stored = getattr(User.objects.get(pk=self.user.pk).profile, field)
+                    with stored.open('rb') as f:
+                        self.assertEqual(f.read(), payload)
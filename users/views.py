@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
 from django.db.models import Q
+from django.core.paginator import Paginator
 from django.contrib import messages
 from django.urls import reverse
 from django.http import JsonResponse
@@ -10,43 +11,38 @@ from django.http import JsonResponse
 from allauth.account.forms import ChangePasswordForm, AddEmailForm
 
 from .forms import ProfileUpdateForm
+from .friendships import friend_ids, friends_of, friendship_statuses
 from .models import FriendRequest, Profile
 
-@login_required
-def find_friends(request):
-    query = request.GET.get('q', '')
-    results = []
-    
-    if query:
-        # Find users matching the query, excluding only the user themselves.
-        found_users = User.objects.filter(
-            Q(username__icontains=query)
-        ).exclude(id=request.user.id)
+USERS_PER_PAGE = 20
+MAX_SEARCH_RESULTS = 200
 
-        # For each found user, determine the friendship status with the current user.
-        for user in found_users:
-            status = 'none'
-            request_obj = None
-            
-            # Check for existing requests in either direction
-            sent_request = FriendRequest.objects.filter(from_user=request.user, to_user=user).first()
-            received_request = FriendRequest.objects.filter(from_user=user, to_user=request.user).first()
 
-            if sent_request:
-                if sent_request.status == 'pending':
-                    status = 'pending_sent'
-                    request_obj = sent_request
-                elif sent_request.status == 'accepted':
-                    status = 'friends'
-            elif received_request:
-                 if received_request.status == 'pending':
-                    status = 'pending_received'
-                 elif received_request.status == 'accepted':
-                    status = 'friends'
+def search_users(request, query, exclude_friends=False):
+    """
+    A page of users whose username starts with `query`, each as
+    {'user', 'status', 'request_object'}. Matches use the username prefix
+    index, are capped at MAX_SEARCH_RESULTS, and every status on the page
+    comes from one query.
+    """
+    found_users = User.objects.filter(username__istartswith=query).exclude(id=request.user.id)
+    if exclude_friends:
+        found_users = found_users.exclude(id__in=friend_ids(request.user))
+    found_users = found_users.order_by('username')[:MAX_SEARCH_RESULTS]
+
+    page = Paginator(found_users, USERS_PER_PAGE).get_page(request.GET.get('page'))
+    statuses = friendship_statuses(request.user, [user.id for user in page])
+    page.object_list = [
+        {'user': user, 'status': statuses[user.id][0], 'request_object': statuses[user.id][1]}
+        for user in page
+    ]
+    return page
 
-            # Only add to results if they are not already friends
-            if status != 'friends':
-                results.append({'user': user, 'status': status, 'request_object': request_obj})
+@login_required
+def find_friends(request):
+    query = request.GET.get('q', '')
+    # Users who are already friends are left out.
+    results = search_users(request, query, exclude_friends=True) if query else []
 
     context = {
         'results': results, # Pass 'results' instead of 'users'
@@ -102,44 +98,12 @@ def manage_friends(request):
     sent requests, and finding new friends.
     """
     # Friend list and request logic
-    profile = request.user.profile
-    friends = profile.get_friends()
-    incoming_requests = FriendRequest.objects.filter(to_user=request.user, status='pending')
-    sent_requests = FriendRequest.objects.filter(from_user=request.user, status='pending')
+    friends = friends_of(request.user)
+    incoming_requests = FriendRequest.objects.filter(to_user=request.user, status='pending').select_related('from_user')
+    sent_requests = FriendRequest.objects.filter(from_user=request.user, status='pending').select_related('to_user')
 
-    # --- START: Merged Search Logic ---
     query = request.GET.get('q', '')
-    search_results = []
-    if query:
-        found_users = User.objects.filter(
-            Q(username__icontains=query)
-        ).exclude(id=request.user.id)
-
-        for user in found_users:
-            status = 'none'
-            request_obj = None
-            
-            # Check for existing requests
-            sent_request = FriendRequest.objects.filter(from_user=request.user, to_user=user).first()
-            received_request = FriendRequest.objects.filter(from_user=user, to_user=request.user).first()
-
-            if sent_request:
-                status = sent_request.status # 'pending' or 'accepted'
-                request_obj = sent_request
-            elif received_request:
-                status = received_request.status # 'pending' or 'accepted'
-            
-            # Use a slightly different status name for clarity in the template
-            if status == 'accepted':
-                final_status = 'friends'
-            elif status == 'pending' and sent_request:
-                final_status = 'pending_sent'
-            elif status == 'pending' and received_request:
-                final_status = 'pending_received'
-            else:
-                final_status = 'none'
-
-            search_results.append({'user': user, 'status': final_status, 'request_object': request_obj})
+    search_results = search_users(request, query) if query else []
 
     context = {
         'friends': friends,
@@ -221,6 +185,11 @@ def edit_profile(request):
 def upload_profile_picture(request):
     """
     Handles the AJAX request to upload a cropped profile picture.
+
+    Nothing here is worth a background job: the browser crops and scales the
+    image before sending it, FieldFile.save only streams the upload to
+    storage, and Profile's ImageFields have no width_field/height_field, so
+    Django never opens the image with Pillow.
     """
     try:
         # The file is sent from the frontend
@@ -245,7 +214,8 @@ def upload_profile_picture(request):
 @login_required
 def upload_banner_picture(request):
     """
-    Handles the AJAX request to upload a cropped banner picture.
+    Handles the AJAX request to upload a cropped banner picture. Stored
+    as sent, like upload_profile_picture, without decoding it.
     """
     try:
         cropped_image = request.FILES.get('cropped_image')